@@ -0,0 +1,48 @@
+import time
+from pathlib import Path
+
+from .catalog import load_catalog, mark_archived
+from .locks import exam_lock
+from .storage import RESULTS, VIEWS, archive_table, results_in_database
+
+ARCHIVE_AFTER_DAYS = 365
+_ARCHIVABLE = (".csv", ".parquet", ".feather")
+
+
+def _table_files(data_dir):
+    return [
+        p
+        for p in data_dir.iterdir()
+        if p.is_file() and p.suffix in _ARCHIVABLE and not p.name.startswith(".")
+    ]
+
+
+def archive_exams(base_dir="user-data", older_than_days=ARCHIVE_AFTER_DAYS):
+    # Compresses every saved class/exam whose results have not been saved
+    # for older_than_days. Derived tables (ranks, grouped, changes) are
+    # written when merely viewed, so they don't count towards the age.
+    # Archived tables stay readable through data.storage; saving the exam
+    # again writes it uncompressed.
+    cutoff = time.time() - older_than_days * 86400
+    archived = []
+    for class_name, exams in sorted(load_catalog(base_dir).items()):
+        for exam_name, entry in sorted(exams.items()):
+            data_dir = Path(base_dir) / class_name / exam_name
+            # Results held in SQLite stay there uncompressed, so the exam
+            # isn't archived even if it has derived tables on disk.
+            if (
+                entry.get("archived")
+                or not data_dir.is_dir()
+                or results_in_database(data_dir)
+            ):
+                continue
+            with exam_lock(data_dir):
+                files = _table_files(data_dir)
+                saved = [p for p in files if p.stem in (RESULTS, *VIEWS)]
+                if not saved or max(p.stat().st_mtime for p in saved) > cutoff:
+                    continue
+                for path in files:
+                    archive_table(path)
+            mark_archived(base_dir, class_name, exam_name)
+            archived.append(data_dir)
+    return archived
@@ -0,0 +1,61 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .saver import save_results_to_csv, upsert_results_to_csv
+
+
+def find_workbooks(paths):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(
+                sorted(glob.glob(os.path.join(p, "**", "*.xlsx"), recursive=True))
+            )
+        else:
+            files.append(p)
+    return [f for f in files if not os.path.basename(f).startswith("~$")]
+
+
+def _report(file_path, sheet_name, start, out_dir=None, error=None):
+    return {
+        "File": file_path,
+        "Sheet": sheet_name,
+        "Status": "failed" if error else "ok",
+        "Seconds": round(time.perf_counter() - start, 2),
+        "Output": str(out_dir) if out_dir else error,
+    }
+
+
+def ingest_sheet(file_path, sheet_name, base_dir="user-data", upsert=False):
+    start = time.perf_counter()
+    try:
+        if upsert:
+            out_dir, changes = upsert_results_to_csv(file_path, sheet_name, base_dir)
+            out_dir = f"{out_dir} ({len(changes)} change(s))"
+        else:
+            out_dir = save_results_to_csv(file_path, sheet_name, base_dir)
+    except Exception as e:
+        return _report(file_path, sheet_name, start, error=str(e))
+    return _report(file_path, sheet_name, start, out_dir=out_dir)
+
+
+def ingest_workbooks(paths, base_dir="user-data", workers=None, upsert=False):
+    reports, tasks = [], []
+    for f in find_workbooks(paths):
+        start = time.perf_counter()
+        try:
+            with pd.ExcelFile(f) as xls:
+                tasks.extend((f, s) for s in xls.sheet_names)
+        except Exception as e:
+            reports.append(_report(f, "", start, error=str(e)))
+    if not tasks:
+        return reports
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(ingest_sheet, f, s, base_dir, upsert) for f, s in tasks]
+        for future in as_completed(futures):
+            reports.append(future.result())
+    return reports
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import CACHE_DIR, PARSER_VERSION
+from .parser import extract_class_results, parse_sheet
+from .results import ClassResults
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+# ClassResults fields stored as arrays; the rest go in a JSON "meta" entry.
+ARRAYS = ("roll_nos", "marks", "subject_percentages", "totals", "percentages")
+
+
+def file_digest(file_path):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parse_cache_key(file_path, sheet_name=None, digest=None):
+    digest = digest or file_digest(file_path)
+    raw = f"{digest}|{sheet_name!r}|{PARSER_VERSION}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _read_entry(entry):
+    # Entries hold only arrays and JSON, and np.load refuses pickled objects,
+    # so a cache folder others can write to (e.g. on a shared drive) can't
+    # be used to run code. Anything unreadable or from an older layout is
+    # parsed again.
+    try:
+        with np.load(entry) as saved:
+            meta = json.loads(str(saved["meta"]))
+            parsed = ClassResults(**meta, **{k: saved[k] for k in ARRAYS})
+        os.utime(entry)
+        return parsed
+    except Exception:
+        return None
+
+
+def _write_entry(entry, parsed):
+    meta = {
+        "class_name": parsed.class_name,
+        "exam_name": parsed.exam_name,
+        "subjects": parsed.subjects,
+        "per_subject_out_of": parsed.per_subject_out_of,
+        "names": parsed.names.tolist(),
+    }
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            meta=np.array(json.dumps(meta, default=_plain)),
+            **{k: getattr(parsed, k) for k in ARRAYS},
+        )
+    os.replace(tmp, entry)
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+def evict(cache_dir, max_bytes=MAX_CACHE_BYTES):
+    entries = []
+    # *.pkl are entries from before the cache stopped pickling.
+    for p in [*Path(cache_dir).glob("*.npz"), *Path(cache_dir).glob("*.pkl")]:
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def load_class_results(file_path, sheet_name=None, cache_dir=None):
+    cache_dir = Path(cache_dir or CACHE_DIR) / "parsed"
+    entry = cache_dir / f"{parse_cache_key(file_path, sheet_name)}.npz"
+    parsed = _read_entry(entry)
+    if parsed is None:
+        parsed = extract_class_results(file_path, sheet_name=sheet_name)
+        _write_entry(entry, parsed)
+        evict(cache_dir)
+    return parsed
+
+
+def load_workbook_results(file_path, cache_dir=None):
+    # Every sheet through one open workbook; a bad sheet is reported, not fatal.
+    cache_dir = Path(cache_dir or CACHE_DIR) / "parsed"
+    digest = file_digest(file_path)
+    loaded = []
+    with pd.ExcelFile(file_path) as xls:
+        for name in xls.sheet_names:
+            entry = cache_dir / f"{parse_cache_key(file_path, name, digest)}.npz"
+            parsed = _read_entry(entry)
+            if parsed is None:
+                try:
+                    parsed = parse_sheet(xls, name)
+                except ValueError as e:
+                    loaded.append((name, None, e))
+                    continue
+                _write_entry(entry, parsed)
+            loaded.append((name, parsed, None))
+    evict(cache_dir)
+    return loaded
@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from . import database
+from .locks import atomic_path, exam_lock, file_lock
+from .storage import ARCHIVE_SUFFIX, RESULTS, find_table, read_table
+
+CATALOG_FILE = "catalog.json"
+CATALOG_LOCK = ".catalog.lock"
+
+
+def _catalog_path(base_dir):
+    return Path(base_dir) / CATALOG_FILE
+
+
+def _timestamp(seconds=None):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds))
+
+
+def _catalog_lock(base_dir):
+    # Held across read-modify-write so parallel ingests don't drop entries.
+    return file_lock(Path(base_dir) / CATALOG_LOCK)
+
+
+def _write_catalog(base_dir, catalog):
+    path = _catalog_path(base_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = atomic_path(path)
+    try:
+        tmp.write_text(json.dumps(catalog, indent=1, sort_keys=True))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def rebuild_catalog(base_dir="user-data"):
+    with _catalog_lock(base_dir):
+        return _rebuild_catalog(base_dir)
+
+
+def _rebuild_catalog(base_dir):
+    # One full walk of the saved data; afterwards the saver and deletes keep
+    # the catalog current.
+    base = Path(base_dir)
+    if not base.is_dir():
+        return {}
+    exams = {p.relative_to(base).parts for p in base.glob("*/*") if p.is_dir()}
+    exams.update(
+        (c, e)
+        for c in database.list_classes(base_dir)
+        for e in database.list_exams(base_dir, c)
+    )
+    catalog = {}
+    for class_name, exam_name in sorted(exams):
+        data_dir = base / class_name / exam_name
+        try:
+            df = read_table(data_dir, "percentage")
+            path = find_table(data_dir, RESULTS) or find_table(data_dir, "percentage")
+            updated = _timestamp(path.stat().st_mtime if path else None)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            # One damaged folder (e.g. an empty table left by an interrupted
+            # save) mustn't keep every menu from listing the others.
+            print(f"    Skipped {class_name}/{exam_name}: {e}")
+            continue
+        entry = {
+            "rows": len(df),
+            "subjects": [c[:-2] for c in df.columns if c.endswith("_%")],
+            "updated": updated,
+        }
+        if path is not None and path.name.endswith(ARCHIVE_SUFFIX):
+            entry["archived"] = True
+        catalog.setdefault(class_name, {})[exam_name] = entry
+    _write_catalog(base_dir, catalog)
+    return catalog
+
+
+def _load_catalog(base_dir):
+    # Callers hold the catalog lock.
+    try:
+        return json.loads(_catalog_path(base_dir).read_text())
+    except (OSError, ValueError):
+        return _rebuild_catalog(base_dir)
+
+
+def load_catalog(base_dir="user-data"):
+    try:
+        return json.loads(_catalog_path(base_dir).read_text())
+    except (OSError, ValueError):
+        pass
+    # Another process may have written it while we waited for the lock.
+    with _catalog_lock(base_dir):
+        return _load_catalog(base_dir)
+
+
+def record_exam(base_dir, class_name, exam_name, rows, subjects):
+    with _catalog_lock(base_dir):
+        catalog = _load_catalog(base_dir)
+        catalog.setdefault(class_name, {})[exam_name] = {
+            "rows": int(rows),
+            "subjects": list(subjects),
+            "updated": _timestamp(),
+        }
+        _write_catalog(base_dir, catalog)
+
+
+def mark_archived(base_dir, class_name, exam_name):
+    with _catalog_lock(base_dir):
+        catalog = _load_catalog(base_dir)
+        entry = catalog.get(class_name, {}).get(exam_name)
+        if entry is not None:
+            entry["archived"] = True
+            _write_catalog(base_dir, catalog)
+
+
+def forget_exam(base_dir, class_name, exam_name=None):
+    with _catalog_lock(base_dir):
+        catalog = _load_catalog(base_dir)
+        if exam_name is None:
+            catalog.pop(class_name, None)
+        else:
+            catalog.get(class_name, {}).pop(exam_name, None)
+            if not catalog.get(class_name, True):
+                del catalog[class_name]
+        _write_catalog(base_dir, catalog)
+
+
+def catalog_entry(base_dir, class_name, exam_name):
+    return load_catalog(base_dir).get(class_name, {}).get(exam_name)
+
+
+def list_classes(base_dir="user-data"):
+    return sorted(c for c, exams in load_catalog(base_dir).items() if exams)
+
+
+def list_exams(base_dir, class_name):
+    return sorted(load_catalog(base_dir).get(class_name, {}))
+
+
+def delete_data(base_dir, class_name, exam_name=None):
+    exams = [exam_name] if exam_name is not None else list_exams(base_dir, class_name)
+    for exam in exams:
+        with exam_lock(Path(base_dir) / class_name / exam):
+            shutil.rmtree(Path(base_dir) / class_name / exam, ignore_errors=True)
+            database.delete_exam(base_dir, class_name, exam)
+    if exam_name is None:
+        shutil.rmtree(Path(base_dir) / class_name, ignore_errors=True)
+        database.delete_exam(base_dir, class_name)
+    forget_exam(base_dir, class_name, exam_name)
@@ -0,0 +1,15 @@
+import os
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get("RESULT_ANALYSIS_CACHE", ".result-cache"))
+
+# Bump whenever parsing output changes so cached parses and layouts are rebuilt.
+PARSER_VERSION = 3
+
+# Format result tables are written in: "csv", "parquet", "feather" or "sqlite".
+# Parquet and Feather need pyarrow (pip install result-analysis[columnar]);
+# "sqlite" keeps results in a single user-data/results.db.
+STORAGE_FORMAT = os.environ.get("RESULT_ANALYSIS_STORAGE", "csv").strip().lower()
+
+# Memory budget for tables kept loaded between reads in one session.
+FRAME_CACHE_BYTES = int(os.environ.get("RESULT_ANALYSIS_FRAME_CACHE_MB", "256")) << 20
@@ -0,0 +1,291 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DB_FILE = "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS exams (
+    id INTEGER PRIMARY KEY,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    updated_at REAL,
+    UNIQUE (class_id, name)
+);
+CREATE TABLE IF NOT EXISTS subjects (
+    exam_id INTEGER NOT NULL REFERENCES exams(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (exam_id, idx)
+);
+CREATE TABLE IF NOT EXISTS students (
+    exam_id INTEGER NOT NULL REFERENCES exams(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    roll_no INTEGER,
+    name TEXT,
+    total REAL,
+    percentage REAL,
+    PRIMARY KEY (exam_id, position)
+);
+CREATE TABLE IF NOT EXISTS marks (
+    exam_id INTEGER NOT NULL REFERENCES exams(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    marks REAL,
+    percent REAL,
+    PRIMARY KEY (exam_id, position, subject)
+);
+CREATE INDEX IF NOT EXISTS idx_exams_name ON exams(name);
+CREATE INDEX IF NOT EXISTS idx_students_roll ON students(roll_no, exam_id);
+CREATE INDEX IF NOT EXISTS idx_marks_subject ON marks(subject, exam_id);
+"""
+
+
+def db_path(base_dir):
+    return Path(base_dir) / DB_FILE
+
+
+def connect(base_dir):
+    Path(base_dir).mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(db_path(base_dir), timeout=30)
+    con.execute("PRAGMA foreign_keys = ON")
+    con.execute("PRAGMA journal_mode = WAL")
+    con.executescript(SCHEMA)
+    return con
+
+
+def _exam_id(con, class_name, exam_name, create=False):
+    row = con.execute(
+        "SELECT e.id FROM exams e JOIN classes c ON c.id = e.class_id "
+        "WHERE c.name = ? AND e.name = ?",
+        (class_name, exam_name),
+    ).fetchone()
+    if row or not create:
+        return row[0] if row else None
+    con.execute("INSERT OR IGNORE INTO classes (name) VALUES (?)", (class_name,))
+    (class_id,) = con.execute(
+        "SELECT id FROM classes WHERE name = ?", (class_name,)
+    ).fetchone()
+    cur = con.execute(
+        "INSERT INTO exams (class_id, name) VALUES (?, ?)", (class_id, exam_name)
+    )
+    return cur.lastrowid
+
+
+def _nullable(values):
+    return [None if pd.isna(v) else v for v in values]
+
+
+def _subjects(frame):
+    return [c[: -len("_Marks")] for c in frame.columns if c.endswith("_Marks")]
+
+
+def _write_rows(con, exam_id, frame, positions):
+    n = len(frame)
+    con.execute("UPDATE exams SET updated_at = ? WHERE id = ?", (time.time(), exam_id))
+    con.executemany(
+        "INSERT INTO students (exam_id, position, roll_no, name, total, percentage) "
+        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (exam_id, position) DO UPDATE SET "
+        "roll_no = excluded.roll_no, name = excluded.name, "
+        "total = excluded.total, percentage = excluded.percentage",
+        zip(
+            [exam_id] * n,
+            positions,
+            _nullable(frame["Roll No"].tolist()),
+            _nullable(frame["Name"].tolist()),
+            _nullable(frame["Total"].tolist()),
+            _nullable(frame["Percentage"].tolist()),
+        ),
+    )
+    for s in _subjects(frame):
+        percents = frame[f"{s}_%"] if f"{s}_%" in frame else [None] * n
+        con.executemany(
+            "INSERT INTO marks (exam_id, position, subject, marks, percent) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (exam_id, position, subject) "
+            "DO UPDATE SET marks = excluded.marks, percent = excluded.percent",
+            zip(
+                [exam_id] * n,
+                positions,
+                [s] * n,
+                _nullable(frame[f"{s}_Marks"].tolist()),
+                _nullable(list(percents)),
+            ),
+        )
+
+
+def save_results(base_dir, class_name, exam_name, frame):
+    # Replaces the exam's students and marks with the rows of a combined
+    # results frame (see data.results.split_frame for its columns).
+    save_result_chunks(base_dir, class_name, exam_name, [frame])
+
+
+def save_result_chunks(base_dir, class_name, exam_name, frames):
+    # save_results from consecutive chunks of the results rows, written in
+    # one transaction so readers never see a partly saved exam.
+    with connect(base_dir) as con:
+        exam_id = _exam_id(con, class_name, exam_name, create=True)
+        for table in ("students", "marks", "subjects"):
+            con.execute(f"DELETE FROM {table} WHERE exam_id = ?", (exam_id,))
+        start = 0
+        for frame in frames:
+            if start == 0:
+                con.executemany(
+                    "INSERT INTO subjects (exam_id, idx, name) VALUES (?, ?, ?)",
+                    [(exam_id, i, s) for i, s in enumerate(_subjects(frame))],
+                )
+            _write_rows(con, exam_id, frame, list(range(start, start + len(frame))))
+            start += len(frame)
+    con.close()
+
+
+def upsert_results(base_dir, class_name, exam_name, frame, removed=()):
+    # Updates the students of a saved exam that share a roll number with a
+    # row of frame, appends the rest and deletes those whose roll number is
+    # in removed; nothing else is rewritten.
+    with connect(base_dir) as con:
+        exam_id = _exam_id(con, class_name, exam_name)
+        stored = dict(
+            con.execute(
+                "SELECT roll_no, position FROM students WHERE exam_id = ?",
+                (exam_id,),
+            ).fetchall()
+        )
+        gone = [(exam_id, stored[r]) for r in removed if r in stored]
+        for table in ("students", "marks"):
+            con.executemany(
+                f"DELETE FROM {table} WHERE exam_id = ? AND position = ?", gone
+            )
+        next_position = max(stored.values(), default=-1) + 1
+        positions = []
+        for roll_no in frame["Roll No"].tolist():
+            if roll_no not in stored:
+                stored[roll_no], next_position = next_position, next_position + 1
+            positions.append(stored[roll_no])
+        _write_rows(con, exam_id, frame, positions)
+    con.close()
+
+
+def has_results(base_dir, class_name, exam_name):
+    if not db_path(base_dir).is_file():
+        return False
+    con = connect(base_dir)
+    try:
+        return _exam_id(con, class_name, exam_name) is not None
+    finally:
+        con.close()
+
+
+def exam_updated(base_dir, class_name, exam_name):
+    # When the exam's rows were last written, or None if it isn't stored.
+    if not db_path(base_dir).is_file():
+        return None
+    con = connect(base_dir)
+    try:
+        row = con.execute(
+            "SELECT e.updated_at FROM exams e JOIN classes c ON c.id = e.class_id "
+            "WHERE c.name = ? AND e.name = ?",
+            (class_name, exam_name),
+        ).fetchone()
+        return row and row[0]
+    finally:
+        con.close()
+
+
+def read_results(base_dir, class_name, exam_name, columns=None):
+    con = connect(base_dir)
+    try:
+        exam_id = _exam_id(con, class_name, exam_name)
+        if exam_id is None:
+            raise FileNotFoundError(
+                f"No results for {class_name} - {exam_name} in {db_path(base_dir)}"
+            )
+        subjects = [
+            r[0]
+            for r in con.execute(
+                "SELECT name FROM subjects WHERE exam_id = ? ORDER BY idx", (exam_id,)
+            )
+        ]
+        students = pd.read_sql_query(
+            "SELECT position, roll_no, name, total, percentage FROM students "
+            "WHERE exam_id = ? ORDER BY position",
+            con,
+            params=(exam_id,),
+        )
+        long = pd.read_sql_query(
+            "SELECT position, subject, marks, percent FROM marks WHERE exam_id = ?",
+            con,
+            params=(exam_id,),
+        )
+    finally:
+        con.close()
+    rows = pd.Index(students["position"]).get_indexer(long["position"])
+    cols = pd.Index(subjects).get_indexer(long["subject"])
+    matrices = {}
+    for value in ("marks", "percent"):
+        matrices[value] = np.full((len(students), len(subjects)), np.nan)
+        matrices[value][rows, cols] = long[value].to_numpy(dtype=float)
+    frame = pd.DataFrame(
+        {
+            "Roll No": students["roll_no"],
+            "Name": students["name"],
+            **{f"{s}_Marks": matrices["marks"][:, i] for i, s in enumerate(subjects)},
+            "Total": students["total"].astype(float),
+            "Percentage": students["percentage"].astype(float),
+            **{f"{s}_%": matrices["percent"][:, i] for i, s in enumerate(subjects)},
+        }
+    )
+    return frame if columns is None else frame[list(columns)]
+
+
+def list_classes(base_dir):
+    if not db_path(base_dir).is_file():
+        return []
+    con = connect(base_dir)
+    try:
+        return [
+            r[0]
+            for r in con.execute(
+                "SELECT DISTINCT c.name FROM classes c JOIN exams e "
+                "ON e.class_id = c.id ORDER BY c.name"
+            )
+        ]
+    finally:
+        con.close()
+
+
+def list_exams(base_dir, class_name):
+    if not db_path(base_dir).is_file():
+        return []
+    con = connect(base_dir)
+    try:
+        return [
+            r[0]
+            for r in con.execute(
+                "SELECT e.name FROM exams e JOIN classes c ON c.id = e.class_id "
+                "WHERE c.name = ? ORDER BY e.name",
+                (class_name,),
+            )
+        ]
+    finally:
+        con.close()
+
+
+def delete_exam(base_dir, class_name, exam_name=None):
+    if not db_path(base_dir).is_file():
+        return
+    with connect(base_dir) as con:
+        if exam_name is None:
+            con.execute("DELETE FROM classes WHERE name = ?", (class_name,))
+        else:
+            con.execute(
+                "DELETE FROM exams WHERE id = ?",
+                (_exam_id(con, class_name, exam_name),),
+            )
+    con.close()
@@ -0,0 +1,57 @@
+import os
+from collections import OrderedDict
+
+from .config import FRAME_CACHE_BYTES
+
+# key -> (stamp, frame, bytes), least recently used first.
+_frames = OrderedDict()
+_total = 0
+
+
+def file_stamp(*paths):
+    # Changes whenever any of the files is rewritten; missing files count too.
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def cached_frame(key, stamp, load, columns=None, max_bytes=None):
+    # Returns load(columns), reusing the frame loaded for the same key and
+    # stamp earlier in this process. A projection is served from the whole
+    # table when that is already loaded. Callers get their own copy: pandas
+    # before 3.0 has no copy-on-write, so edits to a shallow copy would
+    # change the cached frame.
+    global _total
+    budget = FRAME_CACHE_BYTES if max_bytes is None else max_bytes
+    for k, project in (((key, None), True), ((key, _cols(columns)), False)):
+        hit = _frames.get(k)
+        if hit is not None and hit[0] == stamp:
+            _frames.move_to_end(k)
+            df = hit[1][list(columns)] if project and columns is not None else hit[1]
+            return df.copy()
+    df = load(columns)
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    k = (key, _cols(columns))
+    if k in _frames:
+        _total -= _frames.pop(k)[2]
+    if size <= budget:
+        _frames[k] = (stamp, df, size)
+        _total += size
+        while _total > budget:
+            _total -= _frames.popitem(last=False)[1][2]
+    return df.copy()
+
+
+def _cols(columns):
+    return None if columns is None else tuple(columns)
+
+
+def clear_frames():
+    global _total
+    _frames.clear()
+    _total = 0
@@ -0,0 +1,133 @@
+from pathlib import Path
+
+import numpy as np
+
+from .locks import atomic_path, exam_lock
+from .storage import read_table, table_version
+
+# Per-subject percentage histograms of each class/exam, kept next to its
+# tables. Percentages are stored to two decimals, so 0.01-wide bins count
+# them exactly: bin 0 is below 0, bins 1..10001 are 0.00..100.00, then
+# above 100, then blank.
+HIST_FILE = ".histogram.npz"
+SCALE = 100
+BELOW = 0
+ABOVE = 100 * SCALE + 2
+BLANK = ABOVE + 1
+N_BINS = BLANK + 1
+
+
+def subject_columns(df):
+    return [c for c in df.columns if c.endswith("_%") and c != "Overall_Percentage"]
+
+
+def histogram_counts(df):
+    # (subjects, counts): counts[i, b] is how many students of subject i
+    # fall in bin b.
+    columns = subject_columns(df)
+    values = df[columns].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        bins = np.rint(values * SCALE) + 1
+    bins = np.where(values < 0, BELOW, np.where(bins >= ABOVE, ABOVE, bins))
+    bins = np.where(np.isnan(values), BLANK, bins).astype(np.int64)
+    # Offset each subject's bins so one bincount counts every subject.
+    bins += np.arange(len(columns)) * N_BINS
+    counts = np.bincount(bins.ravel(), minlength=len(columns) * N_BINS)
+    return [c[:-2] for c in columns], counts.reshape(len(columns), N_BINS)
+
+
+class Histograms:
+    # Per-subject bin counts and their running totals along the bins, so
+    # the students of a subject in any range of bins are a difference of
+    # two cumulative counts.
+
+    def __init__(self, subjects, counts, cumulative=None, version=None):
+        self.subjects = list(subjects)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        if cumulative is None:
+            cumulative = self.counts.cumsum(axis=1)
+        self.cumulative = np.asarray(cumulative, dtype=np.int64)
+        self.version = version
+
+    def __repr__(self):
+        return f"Histograms(subjects={len(self.subjects)}, students={self.students})"
+
+    @property
+    def students(self):
+        return int(self.counts[0].sum()) if self.subjects else 0
+
+    def count_between(self, low, high):
+        # Students per subject with low <= percentage <= high.
+        lo = max(int(np.ceil(low * SCALE - 1e-6)) + 1, BELOW + 1)
+        hi = min(int(np.floor(high * SCALE + 1e-6)) + 1, ABOVE - 1)
+        if hi < lo:
+            return np.zeros(len(self.subjects), dtype=np.int64)
+        return self.cumulative[:, hi] - self.cumulative[:, lo - 1]
+
+    def blank(self):
+        return self.counts[:, BLANK]
+
+    def marked(self):
+        # Students per subject with a percentage, in range or not.
+        return self.counts.sum(axis=1) - self.blank()
+
+    def __add__(self, other):
+        # Histograms of two classes summed per subject (union of subjects).
+        subjects = list(dict.fromkeys([*self.subjects, *other.subjects]))
+        counts = np.zeros((len(subjects), N_BINS), dtype=np.int64)
+        for hist in (self, other):
+            counts[[subjects.index(s) for s in hist.subjects]] += hist.counts
+        return Histograms(subjects, counts)
+
+
+def histogram_path(data_dir):
+    return Path(data_dir) / HIST_FILE
+
+
+def save_histograms(data_dir, hist):
+    # Callers hold the exam lock. The version ties the histograms to the
+    # saved table they were counted from.
+    path = histogram_path(data_dir)
+    tmp = atomic_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                subjects=np.array(hist.subjects, dtype=str),
+                counts=hist.counts,
+                cumulative=hist.cumulative,
+                version=np.array(table_version(data_dir, "percentage") or ""),
+            )
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def record_histograms(data_dir, df):
+    # Counts and saves the histograms of a results or percentage frame that
+    # has just been saved for data_dir.
+    save_histograms(data_dir, Histograms(*histogram_counts(df)))
+
+
+def load_histograms(data_dir):
+    # The class/exam's histograms, recounted from its percentages if they
+    # are missing or were counted from an older save.
+    version = table_version(data_dir, "percentage")
+    try:
+        with np.load(histogram_path(data_dir)) as saved:
+            if str(saved["version"]) == version:
+                return Histograms(
+                    saved["subjects"].tolist(),
+                    saved["counts"],
+                    saved["cumulative"],
+                    version,
+                )
+    except (OSError, ValueError, KeyError):
+        pass
+    if version is None:
+        raise FileNotFoundError(f"No 'percentage' table in {data_dir}")
+    with exam_lock(data_dir):
+        hist = Histograms(*histogram_counts(read_table(data_dir, "percentage")))
+        save_histograms(data_dir, hist)
+    hist.version = version
+    return hist
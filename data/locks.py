@@ -0,0 +1,89 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+
+    msvcrt = None
+except ImportError:  # Windows
+    import msvcrt
+
+LOCK_FILE = ".lock"
+LOCK_TIMEOUT = 60
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+@contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT, poll=0.05):
+    # An OS advisory lock (flock on POSIX, msvcrt on Windows) on a lock file
+    # that stays in place. The OS releases it when the holder exits, however
+    # that happens, so a crashed process never leaves a stale lock behind.
+    path = Path(path)
+    deadline = time.monotonic() + timeout
+    while True:
+        fd = _open(path)
+        if _try_lock(fd):
+            if _same_file(fd, path):
+                break
+            # The folder was deleted, lock file and all, while we waited on
+            # the old file: lock the one that is there now instead.
+            _unlock(fd)
+        os.close(fd)
+        if time.monotonic() >= deadline:
+            raise LockTimeout(f"Timed out waiting for lock {path}")
+        time.sleep(poll)
+    try:
+        yield path
+    finally:
+        _unlock(fd)
+        os.close(fd)
+
+
+def _open(path):
+    while True:
+        try:
+            return os.open(path, os.O_CREAT | os.O_RDWR)
+        except FileNotFoundError:
+            # New folder, or deleted (delete_data) since we last looked.
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+
+def _try_lock(fd):
+    try:
+        if msvcrt is None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd):
+    if msvcrt is None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _same_file(fd, path):
+    try:
+        return os.path.samestat(os.fstat(fd), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+def exam_lock(data_dir, timeout=LOCK_TIMEOUT):
+    # One writer at a time per user-data/<class>/<exam>.
+    return file_lock(Path(data_dir) / LOCK_FILE, timeout)
+
+
+def atomic_path(path):
+    # Temporary sibling of path to write to before os.replace()-ing it in.
+    path = Path(path)
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
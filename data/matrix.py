@@ -0,0 +1,146 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .catalog import load_catalog
+from .locks import atomic_path
+from .storage import read_results
+
+MATRIX_DIR = ".matrix"
+INDEX_FILE = "index.json"
+ARRAYS = ("marks", "percents", "roll_nos", "class_idx", "exam_idx")
+
+
+def matrix_dir(base_dir="user-data"):
+    return Path(base_dir) / MATRIX_DIR
+
+
+def _is_export(path):
+    # Only a missing folder or an earlier export may be replaced.
+    if not path.exists():
+        return True
+    names = {INDEX_FILE, *(f"{name}.npy" for name in ARRAYS)}
+    return path.is_dir() and all(p.name in names for p in path.iterdir())
+
+
+def export_matrix(base_dir="user-data", dest=None):
+    # Lays out every saved class/exam as one students x subjects matrix of
+    # marks (and one of percentages) in .npy files that open_matrix maps
+    # into memory. Subjects are the union over all exams; a subject an exam
+    # doesn't have is NaN. Row counts come from the catalog, and each exam
+    # is read and copied in on its own, so memory use stays at one exam.
+    dest = Path(dest) if dest else matrix_dir(base_dir)
+    if not _is_export(dest):
+        raise ValueError(
+            f"{dest} exists and is not a matrix export; choose a new or empty folder."
+        )
+    catalog = load_catalog(base_dir)
+    exams = [(c, e) for c in sorted(catalog) for e in sorted(catalog[c])]
+    subjects = list(
+        dict.fromkeys(s for c, e in exams for s in catalog[c][e]["subjects"])
+    )
+    classes = sorted({c for c, _ in exams})
+    exam_names = sorted({e for _, e in exams})
+    n = sum(catalog[c][e]["rows"] for c, e in exams)
+
+    tmp = atomic_path(dest)
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    shapes = {"marks": (n, len(subjects)), "percents": (n, len(subjects))}
+    dtypes = {"marks": np.float64, "percents": np.float64, "roll_nos": np.int64}
+    arrays = {
+        name: np.lib.format.open_memmap(
+            tmp / f"{name}.npy",
+            mode="w+",
+            dtype=dtypes.get(name, np.int32),
+            shape=shapes.get(name, (n,)),
+        )
+        for name in ARRAYS
+    }
+    arrays["marks"][:] = np.nan
+    arrays["percents"][:] = np.nan
+    sources, start = {}, 0
+    for class_name, exam_name in exams:
+        df = read_results(Path(base_dir) / class_name / exam_name)
+        names = [c[: -len("_Marks")] for c in df.columns if c.endswith("_Marks")]
+        entry = catalog[class_name][exam_name]
+        if len(df) != entry["rows"] or not set(names) <= set(subjects):
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise ValueError(
+                f"Catalog entry for {class_name} - {exam_name} is out of date; "
+                "run `result-analysis catalog rebuild` first."
+            )
+        stop = start + len(df)
+        cols = [subjects.index(s) for s in names]
+        arrays["marks"][start:stop, cols] = df[[f"{s}_Marks" for s in names]]
+        have = [(i, f"{s}_%") for i, s in zip(cols, names) if f"{s}_%" in df]
+        if have:
+            arrays["percents"][start:stop, [i for i, _ in have]] = df[
+                [c for _, c in have]
+            ]
+        arrays["roll_nos"][start:stop] = df["Roll No"].fillna(-1).to_numpy()
+        arrays["class_idx"][start:stop] = classes.index(class_name)
+        arrays["exam_idx"][start:stop] = exam_names.index(exam_name)
+        sources[f"{class_name}/{exam_name}"] = [start, stop]
+        start = stop
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    index = {
+        "rows": n,
+        "subjects": subjects,
+        "classes": classes,
+        "exams": exam_names,
+        "sources": sources,
+    }
+    (tmp / INDEX_FILE).write_text(json.dumps(index, indent=1))
+    shutil.rmtree(dest, ignore_errors=True)
+    tmp.rename(dest)
+    return dest
+
+
+class MarksMatrix:
+    # The exported matrix, memory-mapped read-only: only the pages a query
+    # touches are read from disk.
+
+    def __init__(self, path):
+        path = Path(path)
+        index = json.loads((path / INDEX_FILE).read_text())
+        self.subjects = index["subjects"]
+        self.classes = index["classes"]
+        self.exams = index["exams"]
+        self.sources = {k: tuple(v) for k, v in index["sources"].items()}
+        for name in ARRAYS:
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.roll_nos)
+
+    def __repr__(self):
+        return (
+            f"MarksMatrix(students={len(self)}, subjects={len(self.subjects)}, "
+            f"classes={len(self.classes)}, exams={len(self.exams)})"
+        )
+
+    def rows(self, class_name, exam_name):
+        # Class/exams are stored contiguously, so this is a slice, not a copy.
+        start, stop = self.sources[f"{class_name}/{exam_name}"]
+        return slice(start, stop)
+
+    def mask(self, class_name=None, exam_name=None):
+        mask = np.ones(len(self), dtype=bool)
+        if class_name is not None:
+            mask &= self.class_idx == self.classes.index(class_name)
+        if exam_name is not None:
+            mask &= self.exam_idx == self.exams.index(exam_name)
+        return mask
+
+    def subject(self, name, percents=True):
+        column = self.subjects.index(name)
+        return (self.percents if percents else self.marks)[:, column]
+
+
+def open_matrix(base_dir="user-data", path=None):
+    return MarksMatrix(Path(path) if path else matrix_dir(base_dir))
@@ -1,6 +1,17 @@
 import pandas as pd
 import numpy as np
-from .utils import coerce_number
+from .utils import coerce_numbers
+from .templates import find_template, remember_template
+from .results import ClassResults, split_frame
+
+ROLL_LABELS = ("rollno", "roll no", "roll_no")
+PER_LABELS = ("per", "%", "percent", "percentage")
+# The header must sit in the first 50 rows and the meta rows in the first 10;
+# blank percent headers are recognised from up to 10 rows under the header.
+HEADER_SCAN_ROWS = 50
+META_SCAN_ROWS = 10
+SNIFF_ROWS = 10
+HEAD_ROWS = HEADER_SCAN_ROWS + SNIFF_ROWS + 1
 
 
 def find_row_with_text(df, text, max_rows=30):
@@ -11,21 +22,30 @@ def find_row_with_text(df, text, max_rows=30):
     return None
 
 
-def find_header_and_meta_rows(df):
-    header_row = None
-    for i in range(min(50, len(df))):
-        row_vals = [str(v).strip().lower() for v in df.iloc[i].astype(str).fillna("")]
-        if any(v in ("rollno", "roll no", "roll_no") for v in row_vals) and (
-            "total" in row_vals
-            or any(v in ("per", "%", "percent", "percentage") for v in row_vals)
+def locate_layout_rows(rows):
+    # One scan of the top rows for the header and the CLASS/EXAM meta rows.
+    # Only text cells can hold the markers, so nothing else is stringified.
+    header_row = class_row = exam_row = None
+    for i, row in enumerate(rows):
+        if i >= HEADER_SCAN_ROWS or (
+            header_row is not None
+            and (i >= META_SCAN_ROWS or None not in (class_row, exam_row))
         ):
-            header_row = i
             break
-    return (
-        header_row,
-        find_row_with_text(df, "CLASS :", 10),
-        find_row_with_text(df, "NAME OF EXAMINATION", 10),
-    )
+        texts = [v.strip().lower() for v in row if isinstance(v, str)]
+        if header_row is None and any(t in ROLL_LABELS for t in texts):
+            if "total" in texts or any(t in PER_LABELS for t in texts):
+                header_row = i
+        if i < META_SCAN_ROWS:
+            if class_row is None and any("class :" in t for t in texts):
+                class_row = i
+            if exam_row is None and any("name of examination" in t for t in texts):
+                exam_row = i
+    return header_row, class_row, exam_row
+
+
+def find_header_and_meta_rows(df):
+    return locate_layout_rows(df.iloc[:HEADER_SCAN_ROWS].itertuples(index=False))
 
 
 def parse_exam_and_outof(df, exam_row):
@@ -87,11 +107,12 @@ def detect_subject_columns(df, header_row):
                 percent_col = ci + 1
                 ci += 2
             elif ci + 1 < end_ci and headers[ci + 1].strip() == "":
-                numeric_like = 0
-                for r in range(header_row + 1, min(header_row + 11, len(df))):
-                    num = coerce_number(df.iat[r, ci + 1])
-                    if not np.isnan(num) and 0 <= num <= 100:
-                        numeric_like += 1
+                sample = coerce_numbers(
+                    df.iloc[
+                        header_row + 1 : header_row + 1 + SNIFF_ROWS, ci + 1
+                    ].to_numpy()
+                )
+                numeric_like = np.count_nonzero((sample >= 0) & (sample <= 100))
                 if numeric_like >= 2:
                     percent_col = ci + 1
                     ci += 2
@@ -107,95 +128,158 @@ def detect_subject_columns(df, header_row):
     return subjects, subject_to_cols, total_col, per_col
 
 
-def extract_class_results(file_path, sheet_name=None):
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None, dtype=object)
-    if isinstance(df, dict):
-        df = next(iter(df.values()))
-    header_row, class_row, exam_row = find_header_and_meta_rows(df)
+def _round2(values):
+    # np.round only disagrees with round() on a float right at a half, so redo those.
+    out = np.round(values, 2)
+    scaled = values * 100
+    near = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near.any():
+        out[near] = [round(v, 2) for v in values[near].tolist()]
+    return out
+
+
+def _extract_columns(body, n_subjects, per_subject_out_of):
+    # body columns: roll no, name, then the marks column of each subject.
+    n_rows = len(body)
+    rolls = coerce_numbers(body[:, 0])
+    names = pd.Series(body[:, 1], dtype=object)
+    names = np.array(
+        [str(v).strip() for v in names.where(names.notna(), "")], dtype=object
+    )
+    marks = coerce_numbers(body[:, 2 : 2 + n_subjects]).reshape(n_rows, n_subjects)
+    valid = ~np.isnan(marks)
+    subject_percentages = _round2((marks / per_subject_out_of) * 100)
+
+    # Sum each row's valid marks packed to the front, grouped by how many there
+    # are, so numpy adds them in the same (pairwise) order as np.nansum would.
+    counts = valid.sum(axis=1)
+    order = np.argsort(~valid, axis=1, kind="stable")
+    packed = np.take_along_axis(np.where(valid, marks, 0.0), order, axis=1)
+    totals = np.zeros(n_rows)
+    for k in np.unique(counts[counts > 0]):
+        rows = counts == k
+        totals[rows] = np.ascontiguousarray(packed[rows, :k]).sum(axis=1)
+    percentages = np.full(n_rows, np.nan)
+    has_marks = counts > 0
+    percentages[has_marks] = np.round(
+        (totals[has_marks] / (per_subject_out_of * counts[has_marks])) * 100, 2
+    )
+
+    keep = np.isfinite(rolls) & ((names != "") | valid.any(axis=1))
+    return {
+        "roll_nos": rolls[keep].astype(np.int64),
+        "names": names[keep],
+        "marks": marks[keep],
+        "subject_percentages": subject_percentages[keep],
+        "totals": totals[keep],
+        "percentages": percentages[keep],
+    }
+
+
+def read_sheet_head(xls, sheet_name=0):
+    return xls.parse(sheet_name, header=None, dtype=object, nrows=HEAD_ROWS)
+
+
+def detect_layout(head):
+    # Sheets whose header row matches a known template skip column detection;
+    # only the CLASS/EXAM rows are read again since they change per sheet.
+    template = find_template(head)
+    if template is not None:
+        _, class_row, exam_row = locate_layout_rows(
+            head.iloc[:META_SCAN_ROWS].itertuples(index=False)
+        )
+        return {**template, **_meta_names(head, class_row, exam_row)}
+    header_row, class_row, exam_row = find_header_and_meta_rows(head)
     if header_row is None:
         raise ValueError("Header row not found.")
-    exam_name, _ = parse_exam_and_outof(df, exam_row)
-    per_subject_out_of = 100
-    class_name = parse_class_name(df, class_row)
     subjects, subject_to_cols, total_col, per_col = detect_subject_columns(
-        df, header_row
+        head, header_row
     )
-    students = []
-    for r in range(header_row + 1, len(df)):
-        row = df.iloc[r]
-        try:
-            roll_no = int(float(str(row.iloc[0])))
-        except (ValueError, TypeError, IndexError):
-            continue
-        name = (
-            str(row.iloc[1]).strip()
-            if len(row) > 1 and not pd.isna(row.iloc[1])
-            else ""
-        )
+    layout = {
+        "header_row": header_row,
+        "subjects": subjects,
+        "subject_to_cols": subject_to_cols,
+        "total_col": total_col,
+        "per_col": per_col,
+        **_meta_names(head, class_row, exam_row),
+    }
+    remember_template(head, layout)
+    return layout
 
-        marks, subject_percentages = {}, {}
-        for s in subjects:
-            cols = subject_to_cols[s]
-            marks_val = (
-                coerce_number(row.iloc[cols.get("marks")])
-                if cols.get("marks") is not None and cols.get("marks") < len(row)
-                else np.nan
-            )
-            marks[s] = marks_val
-
-            percent_val = np.nan
-            if not np.isnan(marks_val):
-                percent_val = round((marks_val / per_subject_out_of) * 100, 2)
-            subject_percentages[s] = percent_val
-
-        valid_marks_values = [m for m in marks.values() if not np.isnan(m)]
-        total = np.nansum(valid_marks_values)
-
-        num_valid_subjects = len(valid_marks_values)
-
-        percent = np.nan
-        if num_valid_subjects > 0:
-            denom = per_subject_out_of * num_valid_subjects
-            if denom > 0:
-                percent = round((total / denom) * 100, 2)
-
-        if not name and all(np.isnan(v) for v in marks.values()):
-            continue
-        students.append(
-            {
-                "roll_no": roll_no,
-                "name": name,
-                "marks": marks,
-                "subject_percentages": subject_percentages,
-                "total": total,
-                "percentage": percent,
-            }
-        )
 
-    result = {
-        "class_name": class_name,
-        "exam_name": exam_name,
-        "subjects": subjects,
+def _meta_names(head, class_row, exam_row):
+    exam_name, _ = parse_exam_and_outof(head, exam_row)
+    return {"class_name": parse_class_name(head, class_row), "exam_name": exam_name}
+
+
+def body_columns(layout):
+    # Roll no, name and one marks column per subject; nothing else is read.
+    cols = layout["subject_to_cols"]
+    return [0, 1] + [cols[s]["marks"] for s in layout["subjects"]]
+
+
+def result_meta(layout):
+    per_subject_out_of = 100
+    meta = {
+        "class_name": layout["class_name"],
+        "exam_name": layout["exam_name"],
+        "subjects": layout["subjects"],
         "per_subject_out_of": per_subject_out_of,
-        "students": students,
     }
-    if per_subject_out_of and subjects:
-        num_subjects = len(subjects)
-        result["total_out_of"] = per_subject_out_of * num_subjects
-    return result
+    if per_subject_out_of and layout["subjects"]:
+        meta["total_out_of"] = per_subject_out_of * len(layout["subjects"])
+    return meta
+
+
+def build_result(layout, body):
+    meta = result_meta(layout)
+    n_subjects, out_of = len(meta["subjects"]), meta["per_subject_out_of"]
+    return ClassResults(
+        meta["class_name"],
+        meta["exam_name"],
+        meta["subjects"],
+        out_of,
+        **_extract_columns(body, n_subjects, out_of),
+    )
+
+
+def parse_sheet(xls, sheet_name=0):
+    # Layout from the top rows first, then only the needed body columns.
+    layout = detect_layout(read_sheet_head(xls, sheet_name))
+    cols = body_columns(layout)
+    wanted = set(cols)
+    body = xls.parse(
+        sheet_name,
+        header=None,
+        dtype=object,
+        skiprows=layout["header_row"] + 1,
+        usecols=lambda c: c in wanted,
+    )
+    return build_result(layout, body.reindex(columns=cols).to_numpy(dtype=object))
+
+
+def extract_class_results(file_path, sheet_name=None):
+    with pd.ExcelFile(file_path) as xls:
+        return parse_sheet(xls, 0 if sheet_name is None else sheet_name)
 
 
 def results_to_dfs(parsed):
+    if isinstance(parsed, ClassResults):
+        return parsed.to_frames()
     subjects = parsed.get("subjects", [])
-    rows_r, rows_p = [], []
-    for s in parsed.get("students", []):
-        base = {"Roll No": s.get("roll_no"), "Name": s.get("name", "")}
-        row_r, row_p = base.copy(), base.copy()
-        for subj in subjects:
-            row_r[f"{subj}_Marks"] = s.get("marks", {}).get(subj)
-            row_p[f"{subj}_%"] = s.get("subject_percentages", {}).get(subj)
-        row_r["Total"], row_r["Percentage"] = s.get("total"), s.get("percentage")
-        row_p["Overall_Percentage"] = s.get("percentage")
-        rows_r.append(row_r)
-        rows_p.append(row_p)
-    return pd.DataFrame(rows_r), pd.DataFrame(rows_p)
+    students = parsed.get("students", [])
+    if not students:
+        return pd.DataFrame(), pd.DataFrame()
+    marks = [s.get("marks", {}) for s in students]
+    percents = [s.get("subject_percentages", {}) for s in students]
+    frame = pd.DataFrame(
+        {
+            "Roll No": [s.get("roll_no") for s in students],
+            "Name": [s.get("name", "") for s in students],
+            **{f"{subj}_Marks": [m.get(subj) for m in marks] for subj in subjects},
+            "Total": [s.get("total") for s in students],
+            "Percentage": [s.get("percentage") for s in students],
+            **{f"{subj}_%": [p.get(subj) for p in percents] for subj in subjects},
+        }
+    )
+    return split_frame(frame)
@@ -3,7 +3,7 @@
 import pandas as pd
 import numpy as np
 
-from .parser import extract_class_results
+from .cache import load_class_results
 
 def print_parsed_summary(data):
     # This function prints a summary of the parsed data.
@@ -61,7 +61,7 @@ def print_parsed_summary(data):
 def print_class_results(file_path, sheet_name=None):
     # This function reads the Excel file, parses it, and prints the summary.
     # It's a shortcut to do both extraction and printing.
-    data = extract_class_results(file_path, sheet_name=sheet_name)
+    data = load_class_results(file_path, sheet_name=sheet_name)
     print_parsed_summary(data)
 
 
@@ -0,0 +1,134 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .catalog import load_catalog
+from .locks import atomic_path, exam_lock
+from .storage import has_table, read_table, table_version, write_table
+
+# Per class/exam table of each student's ranks, saved next to its results.
+# For the overall percentage and every subject it has the rank within the
+# class and within all classes that sat the exam: competition rank (ties
+# share the best place, 1, 2, 2, 4), dense rank (1, 2, 2, 3) and
+# percentile (share of students scoring at or below).
+RANKS = "ranks"
+# Which saved data of the exam's classes the ranks were computed from.
+RANKS_KEY = ".ranks-key"
+# Bumped when the table's columns change, so older saved tables are redone.
+RANKS_FORMAT = 2
+# Named after the overall column rather than "Overall", which some sheets
+# use as a subject name.
+OVERALL = "Overall_Percentage"
+
+
+def rank_scores(population, values):
+    # (rank, dense rank, percentile) of each of values among the scores in
+    # population, by binary search in the sorted scores; blanks are left
+    # unranked.
+    population = np.sort(population[~np.isnan(population)])
+    distinct = np.unique(population)
+    values = np.asarray(values, dtype=float)
+    blank = np.isnan(values)
+    at_or_below = np.searchsorted(population, values, side="right")
+    rank = len(population) - at_or_below + 1
+    dense = len(distinct) - np.searchsorted(distinct, values, side="right") + 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percentile = np.round(at_or_below * 100 / len(population), 2)
+    return (
+        pd.arrays.IntegerArray(rank.astype(np.int64), blank),
+        pd.arrays.IntegerArray(dense.astype(np.int64), blank),
+        np.where(blank, np.nan, percentile),
+    )
+
+
+def _metrics(df):
+    # (name, column) of the overall percentage and each subject's.
+    return [(OVERALL, OVERALL)] + [
+        (c[:-2], c)
+        for c in df.columns
+        if c.endswith("_%") and c != "Overall_Percentage"
+    ]
+
+
+def compute_ranks(df, exam_frames):
+    # The ranks table of one class's percentage table, ranked within it and
+    # within all of exam_frames (every class of the exam, df included).
+    columns = {}
+    for name, column in _metrics(df):
+        values = df[column].to_numpy(dtype=float)
+        exam_values = np.concatenate(
+            [f[column].to_numpy(dtype=float) for f in exam_frames if column in f]
+        )
+        for scope, population in (("", values), ("Exam_", exam_values)):
+            rank, dense, percentile = rank_scores(population, values)
+            columns[f"{name}_{scope}Rank"] = rank
+            columns[f"{name}_{scope}Dense_Rank"] = dense
+            columns[f"{name}_{scope}Percentile"] = percentile
+    ranks = pd.DataFrame(columns, index=df.index)
+    return pd.concat([df[["Roll No", "Name"]], ranks], axis=1)
+
+
+def exam_key(base_dir, exam_name):
+    # The saved classes that sat the exam and a key that changes whenever
+    # any of them is saved again.
+    catalog = load_catalog(base_dir)
+    classes = [c for c in sorted(catalog) if exam_name in catalog[c]]
+    versions = [
+        table_version(Path(base_dir) / c / exam_name, "percentage") for c in classes
+    ]
+    lines = [f"format\t{RANKS_FORMAT}"]
+    lines += [f"{c}\t{v}" for c, v in zip(classes, versions)]
+    return classes, "\n".join(lines)
+
+
+def update_ranks(base_dir, class_name, exam_name, exam=None):
+    # Recomputes and saves one class/exam's ranks. Ingest doesn't rank:
+    # a class's table is computed when first read and redone on a later
+    # read once any class of the exam has been saved again (load_ranks).
+    classes, key = exam or exam_key(base_dir, exam_name)
+    frames = {
+        c: read_table(Path(base_dir) / c / exam_name, "percentage") for c in classes
+    }
+    ranks = compute_ranks(frames[class_name], list(frames.values()))
+    data_dir = Path(base_dir) / class_name / exam_name
+    with exam_lock(data_dir):
+        write_table(ranks, data_dir, RANKS)
+        path = data_dir / RANKS_KEY
+        tmp = atomic_path(path)
+        try:
+            tmp.write_text(key)
+            tmp.replace(path)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return ranks
+
+
+def load_ranks(base_dir, class_name, exam_name, exam=None):
+    # The saved ranks table, brought up to date first if this class or any
+    # other class of the exam was saved since it was computed.
+    data_dir = Path(base_dir) / class_name / exam_name
+    exam = exam or exam_key(base_dir, exam_name)
+    try:
+        current = (data_dir / RANKS_KEY).read_text() == exam[1]
+    except OSError:
+        current = False
+    if current and has_table(data_dir, RANKS):
+        return read_table(data_dir, RANKS)
+    return update_ranks(base_dir, class_name, exam_name, exam)
+
+
+def exam_ranks(base_dir, exam_name):
+    # Every student of the exam across classes, best overall rank first.
+    exam = exam_key(base_dir, exam_name)
+    if not exam[0]:
+        return pd.DataFrame()
+    ranks = pd.concat(
+        [load_ranks(base_dir, c, exam_name, exam).assign(Class=c) for c in exam[0]],
+        ignore_index=True,
+    )
+    columns = ["Class", "Roll No", "Name"]
+    columns += [c for c in ranks.columns if c.startswith(f"{OVERALL}_Exam_")]
+    return ranks[columns].sort_values(
+        [f"{OVERALL}_Exam_Rank", "Class", "Roll No"], ignore_index=True
+    )
@@ -0,0 +1,207 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+
+class ClassResults(Mapping):
+    # One class/exam held column-wise: a row per student, a column per subject.
+    # Reads like the old result dict; "students" is built only when asked for.
+
+    def __init__(
+        self,
+        class_name,
+        exam_name,
+        subjects,
+        per_subject_out_of,
+        roll_nos,
+        names,
+        marks,
+        subject_percentages,
+        totals,
+        percentages,
+    ):
+        self.class_name = class_name
+        self.exam_name = exam_name
+        self.subjects = list(subjects)
+        self.per_subject_out_of = per_subject_out_of
+        self.roll_nos = np.asarray(roll_nos, dtype=np.int64)
+        self.names = np.asarray(names, dtype=object)
+        self.marks = np.asarray(marks, dtype=np.float64)
+        self.subject_percentages = np.asarray(subject_percentages, dtype=np.float64)
+        self.totals = np.asarray(totals, dtype=np.float64)
+        self.percentages = np.asarray(percentages, dtype=np.float64)
+        self.subject_index = {s: i for i, s in enumerate(self.subjects)}
+
+    @property
+    def total_out_of(self):
+        if self.per_subject_out_of and self.subjects:
+            return self.per_subject_out_of * len(self.subjects)
+        return None
+
+    def _keys(self):
+        keys = ["class_name", "exam_name", "subjects", "per_subject_out_of"]
+        keys.append("students")
+        if self.total_out_of is not None:
+            keys.append("total_out_of")
+        return keys
+
+    def __getitem__(self, key):
+        if key == "students":
+            return list(self.iter_students())
+        if key in self._keys():
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return (
+            f"ClassResults(class_name={self.class_name!r}, "
+            f"exam_name={self.exam_name!r}, students={len(self.roll_nos)}, "
+            f"subjects={len(self.subjects)})"
+        )
+
+    def subject_marks(self, subject):
+        return self.marks[:, self.subject_index[subject]]
+
+    def iter_students(self):
+        subjects = self.subjects
+        for roll_no, name, marks, percents, total, percent in zip(
+            self.roll_nos.tolist(),
+            self.names.tolist(),
+            self.marks.tolist(),
+            self.subject_percentages.tolist(),
+            self.totals.tolist(),
+            self.percentages.tolist(),
+        ):
+            yield {
+                "roll_no": roll_no,
+                "name": name,
+                "marks": dict(zip(subjects, marks)),
+                "subject_percentages": dict(zip(subjects, percents)),
+                "total": total,
+                "percentage": percent,
+            }
+
+    def to_frame(self):
+        return pd.DataFrame(
+            {
+                "Roll No": self.roll_nos,
+                "Name": self.names,
+                **{f"{s}_Marks": self.marks[:, i] for i, s in enumerate(self.subjects)},
+                "Total": self.totals,
+                "Percentage": self.percentages,
+                **{
+                    f"{s}_%": self.subject_percentages[:, i]
+                    for i, s in enumerate(self.subjects)
+                },
+            }
+        )
+
+    def to_frames(self):
+        return split_frame(self.to_frame())
+
+
+def split_frame(frame):
+    # The result and percentage tables as column selections of one combined
+    # frame; Roll No, Name and Percentage are shared, not copied.
+    marks = [c for c in frame.columns if c.endswith("_Marks")]
+    percents = [c for c in frame.columns if c.endswith("_%")]
+    df_r = frame[["Roll No", "Name", *marks, "Total", "Percentage"]]
+    df_p = frame[["Roll No", "Name", *percents, "Percentage"]].rename(
+        columns={"Percentage": "Overall_Percentage"}
+    )
+    return df_r, df_p
+
+
+def combine_frames(df_r, df_p=None):
+    # Inverse of split_frame, for result/percentage tables saved separately.
+    if df_p is None:
+        return df_r
+    percents = [c for c in df_p.columns if c.endswith("_%")]
+    return pd.concat([df_r, df_p[percents]], axis=1)
+
+
+def _cells_differ(old, new):
+    if is_numeric_dtype(old) and is_numeric_dtype(new):
+        # Stored CSVs round-trip floats only to the last digit or so.
+        return ~np.isclose(
+            old.to_numpy(dtype=float),
+            new.to_numpy(dtype=float),
+            rtol=0,
+            atol=1e-9,
+            equal_nan=True,
+        )
+    return (
+        old.fillna("").astype(str).to_numpy() != new.fillna("").astype(str).to_numpy()
+    )
+
+
+def diff_results(old, new, key="Roll No"):
+    # Matches two combined results frames on roll number. Returns the rolls
+    # that changed, the rolls that are new, the rolls missing from new, and
+    # one row per changed cell; or None when the frames can't be matched row
+    # for row (different subjects or duplicate roll numbers).
+    if (
+        list(old.columns) != list(new.columns)
+        or old[key].duplicated().any()
+        or new[key].duplicated().any()
+    ):
+        return None
+    old_i, new_i = old.set_index(key), new.set_index(key)
+    common = new_i.index[new_i.index.isin(old_i.index)]
+    added = new_i.index[~new_i.index.isin(old_i.index)]
+    removed = old_i.index[~old_i.index.isin(new_i.index)]
+    a, b = old_i.loc[common], new_i.loc[common]
+    changed = pd.DataFrame(
+        {c: _cells_differ(a[c], b[c]) for c in new_i.columns}, index=common
+    )
+    rows, cols = np.nonzero(changed.to_numpy())
+    log = pd.DataFrame(
+        {
+            key: common[rows],
+            "Name": b["Name"].to_numpy()[rows],
+            "Column": changed.columns[cols],
+            "Old": [a.iat[r, c] for r, c in zip(rows, cols)],
+            "New": [b.iat[r, c] for r, c in zip(rows, cols)],
+        }
+    )
+    log = pd.concat(
+        [
+            log,
+            pd.DataFrame(
+                {key: added, "Name": new_i.loc[added, "Name"], "Column": "(added)"}
+            ).reset_index(drop=True),
+            pd.DataFrame(
+                {
+                    key: removed,
+                    "Name": old_i.loc[removed, "Name"],
+                    "Column": "(removed)",
+                }
+            ).reset_index(drop=True),
+        ],
+        ignore_index=True,
+    )
+    updated = common[changed.any(axis=1).to_numpy()]
+    return list(updated), list(added), list(removed), log
+
+
+def merge_results(old, new, updated, added, removed=(), key="Roll No"):
+    # old with the updated rows taken from new, the removed rows dropped and
+    # the added rows appended.
+    merged = old.copy()
+    rows = pd.Index(old[key]).get_indexer(updated)
+    src = pd.Index(new[key]).get_indexer(updated)
+    for c in old.columns:
+        values, incoming = merged[c].to_numpy(), new[c].to_numpy()[src]
+        values = values.astype(np.result_type(values, incoming))
+        values[rows] = incoming
+        merged[c] = values
+    merged = merged[~merged[key].isin(removed)]
+    return pd.concat([merged, new[new[key].isin(added)]], ignore_index=True)
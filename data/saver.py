@@ -1,17 +1,177 @@
+import os
+import time
 from pathlib import Path
-from .parser import extract_class_results, results_to_dfs
+
+import pandas as pd
+
+from .catalog import catalog_entry, record_exam
+from .cache import load_class_results, load_workbook_results
+from .stream import stream_class_chunks
+from .config import STORAGE_FORMAT
+from .histogram import Histograms, histogram_counts, record_histograms, save_histograms
+from .locks import exam_lock
+from .results import diff_results, merge_results
+from .storage import (
+    RESULTS,
+    VIEWS,
+    TableWriter,
+    has_table,
+    install_table,
+    read_results,
+    read_table,
+    remove_table,
+    table_path,
+    upsert_results,
+    write_result_chunks,
+    write_table,
+)
 from .utils import sanitize_for_path
 
+# Per-exam log of students changed by upserts.
+CHANGES = "changes"
+# Band counts saved by grouping (see group.ByPercent.grouped_table).
+GROUPED = "grouped"
+
 
-def save_results_to_csv(file_path, sheet_name=None, base_dir="user-data"):
-    parsed = extract_class_results(file_path, sheet_name=sheet_name)
-    out_dir = (
+def _output_dir(parsed, base_dir):
+    return (
         Path(base_dir)
         / sanitize_for_path(parsed.get("class_name"))
         / sanitize_for_path(parsed.get("exam_name"))
     )
-    out_dir.mkdir(parents=True, exist_ok=True)
-    df_r, df_p = results_to_dfs(parsed)
-    df_r.to_csv(out_dir / "result.csv", index=False)
-    df_p.to_csv(out_dir / "percentage.csv", index=False)
+
+
+def save_results_to_csv(
+    file_path, sheet_name=None, base_dir="user-data", streaming=False
+):
+    if streaming:
+        return _save_streamed(file_path, sheet_name, base_dir)
+    return _write_results(load_class_results(file_path, sheet_name), base_dir)
+
+
+def _write_results(parsed, base_dir):
+    out_dir = _output_dir(parsed, base_dir)
+    frame = parsed.to_frame()
+    with exam_lock(out_dir):
+        write_table(frame, out_dir, RESULTS)
+        record_histograms(out_dir, frame)
+        _saved(base_dir, out_dir, len(frame), parsed["subjects"])
+    return out_dir
+
+
+def saved_output_dir(file_path, sheet_name=None, base_dir="user-data"):
+    # Where the sheet is saved if its class/exam has been saved before.
+    out_dir = _output_dir(load_class_results(file_path, sheet_name), base_dir)
+    if catalog_entry(base_dir, out_dir.parent.name, out_dir.name):
+        return out_dir
+    return None
+
+
+def upsert_results_to_csv(file_path, sheet_name=None, base_dir="user-data"):
+    # Re-upload of a saved class/exam: students are matched on roll number,
+    # only added or changed ones are written and those missing from the
+    # sheet are removed. Every changed cell, added and removed student is
+    # appended to the exam's "changes" table. Sheets that can't be matched
+    # that way (subjects changed, duplicate roll numbers) replace the saved
+    # data. A first upload is saved as is. Returns the output folder and the
+    # change rows recorded.
+    parsed = load_class_results(file_path, sheet_name)
+    out_dir = _output_dir(parsed, base_dir)
+    new = parsed.to_frame()
+    with exam_lock(out_dir):
+        old = read_results(out_dir)
+        diff = None if old is None else diff_results(old, new)
+        if diff is None:
+            write_table(new, out_dir, RESULTS)
+            record_histograms(out_dir, new)
+            log = pd.DataFrame(columns=["Roll No", "Name", "Column", "Old", "New"])
+            if old is not None:
+                log.loc[0] = [None, None, "(replaced)", len(old), len(new)]
+            rows = len(new)
+        else:
+            updated, added, removed, log = diff
+            if updated or added or removed or not has_table(out_dir, RESULTS):
+                merged = merge_results(old, new, updated, added, removed)
+                upsert_results(
+                    out_dir,
+                    merged,
+                    new[new["Roll No"].isin(updated + added)],
+                    removed,
+                )
+                record_histograms(out_dir, merged)
+            rows = len(old) + len(added) - len(removed)
+        if len(log):
+            _record_changes(out_dir, log, file_path)
+        _saved(base_dir, out_dir, rows, parsed["subjects"])
+    return out_dir, log
+
+
+def _record_changes(out_dir, log, file_path):
+    log = log.reindex(columns=["Roll No", "Name", "Column", "Old", "New"])
+    for c in ("Old", "New"):
+        log[c] = [None if pd.isna(v) else str(v) for v in log[c]]
+    log.insert(0, "File", os.path.basename(file_path))
+    log.insert(0, "Time", time.strftime("%Y-%m-%d %H:%M:%S"))
+    if has_table(out_dir, CHANGES):
+        log = pd.concat([read_table(out_dir, CHANGES), log], ignore_index=True)
+    write_table(log, out_dir, CHANGES)
+
+
+def _saved(base_dir, out_dir, rows, subjects):
+    # Tables derived from the old results are dropped and rebuilt on demand.
+    for name in (*VIEWS, GROUPED):
+        remove_table(out_dir, name)
+    record_exam(base_dir, out_dir.parent.name, out_dir.name, rows, subjects)
+
+
+def save_workbook_to_csv(file_path, base_dir="user-data"):
+    saved = []
+    for sheet, parsed, error in load_workbook_results(file_path):
+        if error is None:
+            saved.append((sheet, _write_results(parsed, base_dir)))
+        else:
+            saved.append((sheet, error))
+    return saved
+
+
+def _save_streamed(file_path, sheet_name, base_dir):
+    meta, chunks = stream_class_chunks(file_path, sheet_name=sheet_name)
+    out_dir = _output_dir(meta, base_dir)
+    rows, counts, subjects = 0, 0, []
+
+    def frames():
+        nonlocal rows, counts, subjects
+        for chunk in chunks:
+            frame = chunk.to_frame()
+            rows += len(frame)
+            # Histograms add up, so they are counted chunk by chunk too.
+            subjects, chunk_counts = histogram_counts(frame)
+            counts = counts + chunk_counts
+            yield frame
+
+    def finish():
+        save_histograms(out_dir, Histograms(subjects, counts))
+        _saved(base_dir, out_dir, rows, meta["subjects"])
+
+    if STORAGE_FORMAT == "sqlite":
+        # Rows go into results.db as they are read, in one transaction, so
+        # here the lock is held while the sheet is read.
+        with exam_lock(out_dir):
+            write_result_chunks(out_dir, frames())
+            finish()
+        return out_dir
+    # Files are built chunk by chunk at a temporary path. The sheet is read
+    # without holding the lock; it is only taken to swap the table in.
+    writer = TableWriter(table_path(out_dir, RESULTS))
+    try:
+        try:
+            for frame in frames():
+                writer.write(frame)
+        finally:
+            writer.close()
+        with exam_lock(out_dir):
+            install_table(writer.tmp, out_dir, RESULTS)
+            finish()
+    finally:
+        writer.tmp.unlink(missing_ok=True)
     return out_dir
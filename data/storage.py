@@ -0,0 +1,330 @@
+import gzip
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from . import database
+from .config import STORAGE_FORMAT
+from .frames import cached_frame, file_stamp
+from .locks import atomic_path
+from .results import combine_frames, split_frame
+
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+# "sqlite" keeps the results table in <base_dir>/results.db; any other table
+# (e.g. "grouped") is still written next to it as CSV.
+BACKENDS = (*FORMATS, "sqlite")
+
+# Each exam is saved once as the combined "results" table; "result" and
+# "percentage" are read as column views of it. Data saved before that has
+# them as separate tables, which are still read as-is.
+RESULTS = "results"
+VIEWS = ("result", "percentage")
+
+# Archived CSV tables are gzipped in place; Parquet and Feather archives keep
+# their suffix and are only recompressed (see archive_table).
+ARCHIVE_SUFFIX = ".csv.gz"
+SUFFIXES = (*FORMATS.values(), ARCHIVE_SUFFIX)
+
+
+def _check_format(fmt):
+    if fmt not in BACKENDS:
+        raise ValueError(
+            f"Unknown storage format '{fmt}' (expected one of {', '.join(BACKENDS)})."
+        )
+    return fmt
+
+
+def _file_format(fmt=None):
+    fmt = _check_format(fmt or STORAGE_FORMAT)
+    return "csv" if fmt == "sqlite" else fmt
+
+
+def _db_key(data_dir):
+    # user-data/<class>/<exam> -> (user-data, <class>, <exam>)
+    data_dir = Path(data_dir)
+    return data_dir.parent.parent, data_dir.parent.name, data_dir.name
+
+
+def _in_database(data_dir, name):
+    return name == RESULTS and database.has_results(*_db_key(data_dir))
+
+
+def results_in_database(data_dir):
+    # Whether read_table takes the class/exam's results from results.db.
+    return (
+        find_table(data_dir, RESULTS) is None or STORAGE_FORMAT == "sqlite"
+    ) and _in_database(data_dir, RESULTS)
+
+
+def table_path(data_dir, name, fmt=None):
+    return Path(data_dir) / f"{name}{FORMATS[_file_format(fmt)]}"
+
+
+def find_table(data_dir, name):
+    # The configured format first, then whatever older data was written in.
+    for fmt in dict.fromkeys([_file_format(), *FORMATS]):
+        path = table_path(data_dir, name, fmt)
+        if path.is_file():
+            return path
+    path = Path(data_dir) / f"{name}{ARCHIVE_SUFFIX}"
+    return path if path.is_file() else None
+
+
+def _table_name(path):
+    for suffix in SUFFIXES:
+        if path.name.endswith(suffix):
+            return path.name[: -len(suffix)]
+    return None
+
+
+def has_table(data_dir, name):
+    if name in VIEWS and has_table(data_dir, RESULTS):
+        return True
+    return find_table(data_dir, name) is not None or _in_database(data_dir, name)
+
+
+def remove_table(data_dir, name, keep=None):
+    for suffix in SUFFIXES:
+        path = Path(data_dir) / f"{name}{suffix}"
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+
+def install_table(tmp, data_dir, name):
+    # Moves a finished temporary table file into place as `name`.
+    path = table_path(data_dir, name)
+    os.replace(tmp, path)
+    remove_table(data_dir, name, keep=path)
+    return path
+
+
+def write_result_chunks(data_dir, frames):
+    # Saves a results table to results.db from consecutive chunks of its
+    # rows, without holding all of them in memory.
+    database.save_result_chunks(*_db_key(data_dir), frames)
+    remove_table(data_dir, RESULTS)
+    return database.db_path(_db_key(data_dir)[0])
+
+
+class TableWriter:
+    # Writes a table file a chunk of rows at a time, so the whole table is
+    # never held in memory: CSV is appended to, Parquet gets a row group
+    # and Feather (an Arrow IPC file) a record batch per chunk. The file is
+    # built at .tmp, next to path, for the caller to install.
+
+    def __init__(self, path):
+        self.suffix = Path(path).suffix
+        self.tmp = atomic_path(path)
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, df):
+        self.tmp.parent.mkdir(parents=True, exist_ok=True)
+        if self.suffix == ".csv":
+            mode = "a" if self._started else "w"
+            df.to_csv(self.tmp, mode=mode, header=not self._started, index=False)
+            self._started = True
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            schema = table.schema
+            if "Name" in schema.names:
+                # A first chunk of blank names mustn't fix the column as null.
+                i = schema.get_field_index("Name")
+                schema = schema.set(i, pa.field("Name", pa.string()))
+            if self.suffix == ".parquet":
+                self._writer = pq.ParquetWriter(self.tmp, schema)
+            else:
+                options = pa.ipc.IpcWriteOptions(compression="lz4")
+                self._writer = pa.ipc.new_file(self.tmp, schema, options=options)
+            self._schema = schema
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def write_table(df, data_dir, name, fmt=None):
+    if (fmt or STORAGE_FORMAT) == "sqlite" and name == RESULTS:
+        database.save_results(*_db_key(data_dir), df)
+        remove_table(data_dir, name)
+        return database.db_path(_db_key(data_dir)[0])
+    path = table_path(data_dir, name, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Readers only ever see the old table or the complete new one.
+    tmp = atomic_path(path)
+    try:
+        if path.suffix == ".csv":
+            df.to_csv(tmp, index=False)
+        elif path.suffix == ".parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    remove_table(data_dir, name, keep=path)
+    return path
+
+
+def upsert_results(data_dir, merged, rows, removed=()):
+    # Stores a results table of which only `rows` and the dropped `removed`
+    # roll numbers differ from what is saved: the database updates just
+    # those rows, files are rewritten whole.
+    if STORAGE_FORMAT == "sqlite" and _in_database(data_dir, RESULTS):
+        database.upsert_results(*_db_key(data_dir), rows, removed)
+        return database.db_path(_db_key(data_dir)[0])
+    return write_table(merged, data_dir, RESULTS)
+
+
+def read_results(data_dir):
+    # The saved results table, rebuilt from split result/percentage tables
+    # for folders saved in the older layout; None if nothing is saved.
+    if has_table(data_dir, RESULTS):
+        return read_table(data_dir, RESULTS)
+    if not has_table(data_dir, "result"):
+        return None
+    return combine_frames(
+        read_table(data_dir, "result"),
+        (
+            read_table(data_dir, "percentage")
+            if has_table(data_dir, "percentage")
+            else None
+        ),
+    )
+
+
+def read_table(data_dir, name, columns=None):
+    if name in VIEWS and has_table(data_dir, RESULTS):
+        return _read_view(data_dir, name, columns)
+    path = find_table(data_dir, name)
+    if (path is None or STORAGE_FORMAT == "sqlite") and _in_database(data_dir, name):
+        base, class_name, exam_name = _db_key(data_dir)
+        db = database.db_path(base)
+        return cached_frame(
+            (str(db.resolve()), class_name, exam_name),
+            file_stamp(db, f"{db}-wal"),
+            lambda cols: database.read_results(base, class_name, exam_name, cols),
+            columns,
+        )
+    if path is None:
+        raise FileNotFoundError(f"No '{name}' table in {data_dir}")
+    return _read_file(path, columns)
+
+
+def table_version(data_dir, name):
+    # A token that changes whenever the table read by read_table(data_dir,
+    # name) is saved again; None if there is no such table.
+    if name in VIEWS and has_table(data_dir, RESULTS):
+        name = RESULTS
+    path = find_table(data_dir, name)
+    if (path is None or STORAGE_FORMAT == "sqlite") and _in_database(data_dir, name):
+        return f"db:{database.exam_updated(*_db_key(data_dir))!r}"
+    if path is None:
+        return None
+    st = path.stat()
+    return f"{path.name}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def _read_view(data_dir, name, columns=None):
+    if columns is None:
+        df_r, df_p = split_frame(read_table(data_dir, RESULTS))
+        return df_r if name == "result" else df_p
+    source = {"Overall_Percentage": "Percentage"} if name == "percentage" else {}
+    df = read_table(data_dir, RESULTS, [source.get(c, c) for c in columns])
+    return df.rename(columns={v: k for k, v in source.items()})
+
+
+def _read_file(path, columns=None):
+    # Loaded tables are kept for the session, keyed by the file's mtime and
+    # size, so moving between view, group and plot doesn't re-read them.
+    return cached_frame(
+        str(Path(path).resolve()),
+        file_stamp(path),
+        lambda cols: _load_file(path, cols),
+        columns,
+    )
+
+
+def _load_file(path, columns=None):
+    if path.suffix in (".csv", ".gz"):
+        return pd.read_csv(path, usecols=columns)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+
+def export_csv(base_dir, dest_dir):
+    # Mirror every stored <class>/<exam> table under dest_dir as CSV, with
+    # the results table written out as its result and percentage views.
+    tables = {
+        (p.parent, _table_name(p))
+        for p in Path(base_dir).glob("*/*/*")
+        if _table_name(p) and not p.name.startswith(".")
+    }
+    tables.update(
+        (Path(base_dir) / c / e, RESULTS)
+        for c in database.list_classes(base_dir)
+        for e in database.list_exams(base_dir, c)
+    )
+    for data_dir, name in list(tables):
+        if name == RESULTS:
+            tables.remove((data_dir, name))
+            tables.update((data_dir, view) for view in VIEWS)
+    exported = []
+    for data_dir, name in sorted(tables):
+        out = Path(dest_dir) / data_dir.relative_to(base_dir) / f"{name}.csv"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        read_table(data_dir, name).to_csv(out, index=False)
+        exported.append(out)
+    return exported
+
+
+def import_folder_tree(base_dir):
+    # Load every <class>/<exam> saved as files into the database.
+    imported = []
+    for data_dir in sorted(p for p in Path(base_dir).glob("*/*") if p.is_dir()):
+        if find_table(data_dir, RESULTS) is not None:
+            frame = _read_file(find_table(data_dir, RESULTS))
+        elif find_table(data_dir, "result") is not None:
+            frame = read_results(data_dir)
+        else:
+            continue
+        database.save_results(*_db_key(data_dir), frame)
+        imported.append(data_dir)
+    return imported
+
+
+def archive_table(path):
+    # Rewrites one stored table file in its compressed archive form and
+    # returns the new path.
+    if path.suffix == ".csv":
+        target = path.with_name(path.name[: -len(".csv")] + ARCHIVE_SUFFIX)
+    else:
+        target = path
+    tmp = atomic_path(target)
+    try:
+        if path.suffix == ".csv":
+            with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        elif path.suffix == ".parquet":
+            pd.read_parquet(path).to_parquet(tmp, index=False, compression="zstd")
+        elif path.suffix == ".feather":
+            pd.read_feather(path).to_feather(tmp, compression="zstd")
+        else:
+            return path
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    if target != path:
+        path.unlink()
+    return target
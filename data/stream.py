@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from .parser import (
+    HEAD_ROWS,
+    detect_layout,
+    body_columns,
+    result_meta,
+    build_result,
+)
+
+CHUNK_ROWS = 1000
+
+
+def open_sheet(workbook, sheet_name=None):
+    if sheet_name is None:
+        return workbook.worksheets[0]
+    if isinstance(sheet_name, int):
+        return workbook.worksheets[sheet_name]
+    return workbook[sheet_name]
+
+
+def _to_block(rows, cols):
+    block = np.full((len(rows), len(cols)), np.nan, dtype=object)
+    for i, row in enumerate(rows):
+        for j, c in enumerate(cols):
+            if c < len(row) and row[c] is not None:
+                block[i, j] = row[c]
+    return block
+
+
+def stream_class_chunks(file_path, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    # Yields the sheet body as ClassResults of at most chunk_rows students
+    # (a single empty one for a sheet with no body rows).
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = open_sheet(wb, sheet_name).iter_rows(values_only=True)
+        head = []
+        for row in rows:
+            head.append(row)
+            if len(head) >= HEAD_ROWS:
+                break
+        width = max((len(r) for r in head), default=0)
+        layout = detect_layout(
+            pd.DataFrame(_to_block(head, range(width)), dtype=object)
+        )
+    except Exception:
+        wb.close()
+        raise
+    meta = result_meta(layout)
+    cols = body_columns(layout)
+
+    def chunks():
+        try:
+            chunk, emitted = head[layout["header_row"] + 1 :], False
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    yield build_result(layout, _to_block(chunk, cols))
+                    chunk, emitted = [], True
+            if chunk or not emitted:
+                yield build_result(layout, _to_block(chunk, cols))
+        finally:
+            wb.close()
+
+    return meta, chunks()
+
+
+def stream_class_results(file_path, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    meta, chunks = stream_class_chunks(file_path, sheet_name, chunk_rows)
+    return meta, (s for chunk in chunks for s in chunk.iter_students())
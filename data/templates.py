@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from .config import CACHE_DIR, PARSER_VERSION
+
+TEMPLATES_FILE = f"layouts-v{PARSER_VERSION}.json"
+_registry = {}
+
+
+def header_fingerprint(row):
+    # Exact labels: templates carry the subject names as written, so a header
+    # differing only in case must not reuse them.
+    labels = ["" if pd.isna(v) else str(v).strip() for v in row]
+    while labels and not labels[-1]:
+        labels.pop()
+    return hashlib.sha1("\x1f".join(labels).encode()).hexdigest()
+
+
+def _templates_path(cache_dir=None):
+    return Path(cache_dir or CACHE_DIR) / TEMPLATES_FILE
+
+
+def load_templates(cache_dir=None):
+    path = _templates_path(cache_dir)
+    if path not in _registry:
+        try:
+            _registry[path] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            _registry[path] = {}
+    return _registry[path]
+
+
+def find_template(head, cache_dir=None):
+    templates = load_templates(cache_dir)
+    for header_row in sorted({t["header_row"] for t in templates.values()}):
+        if header_row < len(head):
+            key = f"{header_row}:{header_fingerprint(head.iloc[header_row])}"
+            if key in templates:
+                return templates[key]
+    return None
+
+
+def remember_template(head, layout, cache_dir=None):
+    header_row = layout["header_row"]
+    key = f"{header_row}:{header_fingerprint(head.iloc[header_row])}"
+    templates = load_templates(cache_dir)
+    if key in templates:
+        return
+    templates[key] = {
+        k: layout[k]
+        for k in ("header_row", "subjects", "subject_to_cols", "total_col", "per_col")
+    }
+    path = _templates_path(cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        templates.update({**json.loads(path.read_text()), **templates})
+    except (OSError, ValueError):
+        pass
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(templates, indent=1))
+    os.replace(tmp, path)
@@ -1,16 +1,52 @@
 import numpy as np
+import pandas as pd
+
+NA_TOKENS = ("", "NA", "N/A", "#DIV/0!", "-", "AB", "A")
+_NUMBER_TYPES = (int, float, np.int64, np.float64)
 
 
 def coerce_number(x):
     try:
         s = str(x).strip()
-        if s.upper() in ("", "NA", "N/A", "#DIV/0!", "-", "AB", "A"):
+        if s.upper() in NA_TOKENS:
             return np.nan
         return float(s)
     except (ValueError, TypeError):
         return np.nan
 
 
+def _text_to_float(s):
+    try:
+        return float(s)
+    except ValueError:
+        return np.nan
+
+
+def coerce_numbers(values):
+    # Same result as coerce_number on every element, as a float64 array.
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iuf":
+        return arr.astype(np.float64)
+    if arr.dtype.kind == "b":
+        return np.full(arr.shape, np.nan)
+    if arr.dtype.kind == "U":
+        arr = arr.astype(object)
+    flat = pd.Series(arr.ravel(), dtype=object)
+    out = np.full(len(flat), np.nan)
+    kinds = flat.map(type)
+    numeric = kinds.isin(_NUMBER_TYPES).to_numpy()
+    out[numeric] = flat[numeric].to_numpy(dtype=np.float64)
+    text = (kinds == str).to_numpy()
+    if text.any():
+        stripped = flat[text].str.strip()
+        keep = ~stripped.str.upper().isin(NA_TOKENS).to_numpy()
+        out[np.flatnonzero(text)[keep]] = [_text_to_float(s) for s in stripped[keep]]
+    other = ~(numeric | text) & flat.notna().to_numpy()
+    if other.any():
+        out[other] = [coerce_number(v) for v in flat[other]]
+    return out.reshape(arr.shape)
+
+
 def sanitize_for_path(name):
     return (
         str(name).strip().replace("/", "-").replace("\\", "-").replace(" ", "_")
@@ -1,5 +1,4 @@
 import os
-import pandas as pd
 import curses
 from ui.select_data import (
     select_class_exam,
@@ -7,6 +6,7 @@ from ui.select_data import (
     select_from_list_no_curses,
     CURSES_ENABLED,
 )
+from data.storage import has_table, read_table
 from .plotter import plot_chart
 
 
@@ -27,11 +27,13 @@ def plot_graphs_flow(base_dir="user-data"):
 
     if not g_type:
         return
-    csv_path = os.path.join(base_dir, c_name, e_name, "percentage.csv")
-    if not os.path.isfile(csv_path):
-        print(f"    percentage.csv not found for {c_name} - {e_name}")
+    data_dir = os.path.join(base_dir, c_name, e_name)
+    if not has_table(data_dir, "percentage"):
+        print(f"    Percentage data not found for {c_name} - {e_name}")
         return
-    df = pd.read_csv(csv_path)
+    df = read_table(
+        data_dir, "percentage", columns=["Roll No", "Name", "Overall_Percentage"]
+    )
     title = f"{g_type} - {c_name} - {e_name}"
     if "Bar" in g_type:
         plot_chart(
@@ -1,60 +1,44 @@
-import pandas as pd
 import os
-from pathlib import Path
 from data.printer import display_df
+from data.locks import exam_lock
+from data.storage import has_table, read_table, write_table
+from group.cache import grouped_counts
 from ui.select_data import select_class_exam
 from data.exporter import export_df_to_excel
 
 
-def group_by_percent(csv_path):
-    df = pd.read_csv(csv_path)
+def group_by_percent(data_dir):
     user_input = input("    Custom grouping (e.g., 90,80,33) or Enter for default: ")
-    thresholds = sorted(
-        [int(t) for t in user_input.split(",")]
-        if user_input
-        else [90, 80, 70, 60, 50, 40, 33],
-        reverse=True,
+    summary_df = grouped_counts(
+        data_dir, [int(t) for t in user_input.split(",")] if user_input else None
     )
-    if 100 not in thresholds:
-        thresholds.insert(0, 100)
-    grouping = [
-        [(thresholds[i + 1] + 1 if i + 1 < len(thresholds) else 0), thresholds[i]]
-        for i in range(len(thresholds))
-    ]
-    subjects = [
-        c[:-2] for c in df.columns if c.endswith("_%") and c != "Overall_Percentage"
-    ]
-    summary = []
-    for subj in subjects:
+    display_df(summary_df, "Grouped Summary (counts)")
+    return summary_df
 
-        def get_group(score):
-            if pd.isna(score):
-                return "N/A"
-            for low, high in grouping:
-                if low <= score <= high:
-                    return f"{low}-{high}"
-            return "Other"
 
-        summary.append(
-            {
-                "Subject": subj,
-                **df[f"{subj}_%"].apply(get_group).value_counts().to_dict(),
-            }
-        )
-    summary_df = pd.DataFrame(summary).fillna(0)
-    display_df(summary_df, "Grouped Summary (counts)")
-    return df, summary_df
+def grouped_table(data_dir):
+    # The saved grouped table, derived from the percentages with the default
+    # bands and saved the first time it is asked for. Saving the class/exam
+    # again drops it, so it never describes older data.
+    if has_table(data_dir, "grouped"):
+        return read_table(data_dir, "grouped")
+    summary_df = grouped_counts(data_dir)
+    if not summary_df.empty:
+        with exam_lock(data_dir):
+            write_table(summary_df, data_dir, "grouped")
+    return summary_df
 
 
 def group_by_percent_interactive():
     s_class, s_exam = select_class_exam("user-data")
     if not (s_class and s_exam):
         return
-    path = os.path.join("user-data", s_class, s_exam, "percentage.csv")
-    if not os.path.isfile(path):
-        print(f"    'percentage.csv' not found for {s_class} - {s_exam}.")
+    data_dir = os.path.join("user-data", s_class, s_exam)
+    if not has_table(data_dir, "percentage"):
+        print(f"    Percentage data not found for {s_class} - {s_exam}.")
         return
-    _, summary_df = group_by_percent(path)
+    summary_df = group_by_percent(data_dir)
     if not summary_df.empty:
-        (Path(path).parent / "grouped.csv").write_text(summary_df.to_csv(index=False))
+        with exam_lock(data_dir):
+            write_table(summary_df, data_dir, "grouped")
         export_df_to_excel(summary_df, fname="grouped.xlsx")
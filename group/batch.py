@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from data.catalog import load_catalog
+from data.histogram import load_histograms
+from data.locks import exam_lock
+from data.storage import write_table
+from group.bins import NA_LABEL, OTHER_LABEL, band_labels, histogram_band_counts
+from group.cache import grouped_counts
+
+# Band counts of every class/exam together, saved in the base folder.
+SCHOOL_GROUPED = "school-grouped"
+
+
+def group_exam(base_dir, class_name, exam_name, thresholds=None):
+    # Groups one saved class/exam and saves its grouped table; returns the
+    # band counts with Class and Exam columns in front.
+    data_dir = Path(base_dir) / class_name / exam_name
+    summary = grouped_counts(data_dir, thresholds)
+    if not summary.empty:
+        with exam_lock(data_dir):
+            write_table(summary, data_dir, "grouped")
+    summary.insert(0, "Exam", exam_name)
+    summary.insert(0, "Class", class_name)
+    return summary
+
+
+def _group_task(base_dir, class_name, exam_name, thresholds):
+    start = time.perf_counter()
+    try:
+        summary, error = group_exam(base_dir, class_name, exam_name, thresholds), None
+    except Exception as e:
+        summary, error = None, str(e)
+    report = {
+        "Class": class_name,
+        "Exam": exam_name,
+        "Status": "failed" if error else "ok",
+        "Seconds": round(time.perf_counter() - start, 2),
+        "Output": error or f"{0 if summary is None else len(summary)} subject(s)",
+    }
+    return report, summary
+
+
+def group_all(base_dir="user-data", thresholds=None, workers=None):
+    # Groups every class/exam in the catalog on a process pool, saving each
+    # one's grouped table, and saves the combined band counts as the
+    # school-grouped table in base_dir. Returns (combined, reports).
+    catalog = load_catalog(base_dir)
+    tasks = [(c, e) for c in sorted(catalog) for e in sorted(catalog[c])]
+    reports, summaries = [], []
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_group_task, base_dir, c, e, thresholds) for c, e in tasks
+            ]
+            for future in as_completed(futures):
+                report, summary = future.result()
+                reports.append(report)
+                if summary is not None and not summary.empty:
+                    summaries.append(summary)
+    labels = [*band_labels(thresholds), OTHER_LABEL, NA_LABEL]
+    if not summaries:
+        return pd.DataFrame(columns=["Class", "Exam", "Subject", *labels]), reports
+    combined = (
+        pd.concat(summaries, ignore_index=True)
+        .reindex(columns=["Class", "Exam", "Subject", *labels])
+        .sort_values(["Class", "Exam"], kind="stable", ignore_index=True)
+    )
+    combined[labels] = combined[labels].fillna(0).astype("int64")
+    # Like histogram_band_counts, leave out labels no student falls in.
+    combined = combined.drop(columns=[c for c in labels if not combined[c].any()])
+    write_table(combined, base_dir, SCHOOL_GROUPED)
+    return combined, sorted(reports, key=lambda r: (r["Class"], r["Exam"]))
+
+
+def school_band_counts(base_dir="user-data", thresholds=None):
+    # Band counts of each exam over all classes together, per subject, from
+    # the classes' summed histograms rather than their students.
+    catalog = load_catalog(base_dir)
+    totals = {}
+    for class_name in sorted(catalog):
+        for exam_name in sorted(catalog[class_name]):
+            hist = load_histograms(Path(base_dir) / class_name / exam_name)
+            totals[exam_name] = (
+                totals[exam_name] + hist if exam_name in totals else hist
+            )
+    summaries = []
+    for exam_name, hist in sorted(totals.items()):
+        summary = histogram_band_counts(hist, thresholds)
+        summary.insert(0, "Exam", exam_name)
+        summaries.append(summary)
+    labels = [*band_labels(thresholds), OTHER_LABEL, NA_LABEL]
+    columns = ["Exam", "Subject", *labels]
+    if not summaries:
+        return pd.DataFrame(columns=columns)
+    combined = pd.concat(summaries, ignore_index=True).reindex(columns=columns)
+    combined[labels] = combined[labels].fillna(0).astype("int64")
+    return combined.drop(columns=[c for c in labels if not combined[c].any()])
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_THRESHOLDS = [90, 80, 70, 60, 50, 40, 33]
+NA_LABEL = "N/A"
+OTHER_LABEL = "Other"
+
+
+def band_edges(thresholds=None):
+    # [low, high] bands, highest first: each threshold is the top of a band
+    # that starts one above the next threshold down, and 100 is always the
+    # top. Scores between bands (e.g. 80.5 with 90,80) fall in no band.
+    thresholds = sorted(set(thresholds or DEFAULT_THRESHOLDS), reverse=True)
+    if 100 not in thresholds:
+        thresholds.insert(0, 100)
+    return [
+        (thresholds[i + 1] + 1 if i + 1 < len(thresholds) else 0, thresholds[i])
+        for i in range(len(thresholds))
+    ]
+
+
+def band_labels(thresholds=None):
+    return [f"{low}-{high}" for low, high in band_edges(thresholds)]
+
+
+def histogram_band_counts(hist, thresholds=None):
+    # Students per subject in each band, from a class/exam's saved
+    # histograms (data.histogram): two cumulative lookups per band and
+    # subject, whatever the class size. Band columns run highest first,
+    # then "Other" and "N/A"; labels no student falls in are left out.
+    if not hist.subjects:
+        return pd.DataFrame()
+    bands = np.column_stack(
+        [hist.count_between(low, high) for low, high in band_edges(thresholds)]
+    )
+    # Marked scores in no band (between bands or outside 0-100) are "Other".
+    other = hist.marked() - bands.sum(axis=1)
+    counts = np.column_stack([bands, other, hist.blank()])
+    labels = [*band_labels(thresholds), OTHER_LABEL, NA_LABEL]
+    return _summary(hist.subjects, counts, labels)
+
+
+def _summary(subjects, counts, labels):
+    used = counts.any(axis=0)
+    summary = pd.DataFrame(counts[:, used], columns=np.array(labels)[used])
+    summary.insert(0, "Subject", subjects)
+    return summary
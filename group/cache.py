@@ -0,0 +1,35 @@
+import hashlib
+from pathlib import Path
+
+from data.histogram import load_histograms
+from data.locks import exam_lock
+from data.storage import has_table, read_table, table_version, write_table
+from group.bins import band_labels, histogram_band_counts
+
+# Band counts per threshold set are kept in <class>/<exam>/.grouped/, named
+# after the version of the percentages they were counted from.
+GROUPED_CACHE = ".grouped"
+
+
+def grouped_counts(data_dir, thresholds=None):
+    # Band counts of the class/exam's percentages, served from the cache
+    # when the same bands were counted from the same saved data before.
+    # Re-saving the class/exam changes its version, so older entries are
+    # never read again and are cleared out by the next write.
+    version = table_version(data_dir, "percentage")
+    if version is None:
+        raise FileNotFoundError(f"No 'percentage' table in {data_dir}")
+    tag = hashlib.sha1(version.encode()).hexdigest()[:12]
+    cache_dir = Path(data_dir) / GROUPED_CACHE
+    name = f"{tag}_{'_'.join(band_labels(thresholds))}"
+    if has_table(cache_dir, name):
+        return read_table(cache_dir, name)
+    summary = histogram_band_counts(load_histograms(data_dir), thresholds)
+    if summary.empty:
+        return summary
+    with exam_lock(data_dir):
+        for path in cache_dir.glob("*"):
+            if path.is_file() and not path.name.startswith((tag, ".")):
+                path.unlink(missing_ok=True)
+        write_table(summary, cache_dir, name)
+    return summary
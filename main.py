@@ -14,9 +14,25 @@ from ui.select_data import (
     CURSES_ENABLED,
 )
 from ui.view_data import view_data_flow
-from data.saver import save_results_to_csv
+from data.saver import (
+    save_results_to_csv,
+    save_workbook_to_csv,
+    saved_output_dir,
+    upsert_results_to_csv,
+)
+from data.archive import ARCHIVE_AFTER_DAYS, archive_exams
+from data.batch import ingest_workbooks
+from data.matrix import export_matrix, open_matrix
+from data.printer import display_df
+from data.ranks import exam_ranks
+from data.storage import export_csv, import_folder_tree
+from data.catalog import delete_data, list_classes, list_exams, rebuild_catalog
 from graphs.plot_data import plot_graphs_flow
 from group.ByPercent import group_by_percent_interactive
+from group.batch import SCHOOL_GROUPED, group_all, school_band_counts
+
+# Workbooks bigger than this are read row-by-row instead of loaded whole.
+STREAMING_MIN_BYTES = 20 * 1024 * 1024
 
 
 def upload_pipeline():
@@ -34,19 +50,44 @@ def upload_pipeline():
     try:
         sheets = pd.ExcelFile(fpath).sheet_names
         print("    Sheets:", ", ".join(sheets))
-        sheet = input("    Sheet name (Enter for first): ").strip() or 0
+        sheet = (
+            input("    Sheet name (Enter for first, 'all' for every sheet): ").strip()
+            or 0
+        )
         s_dir = "user-data"
         print("    Class data stored on the user-data folder")
-        out = save_results_to_csv(fpath, sheet_name=sheet, base_dir=s_dir)
+        if sheet == "all" and "all" not in sheets:
+            for name, out in save_workbook_to_csv(fpath, base_dir=s_dir):
+                if isinstance(out, Exception):
+                    print(f"    {name}: Error: {out}")
+                else:
+                    print(f"    {name}: Saved to: {out}")
+            return
+        streaming = os.path.getsize(fpath) >= STREAMING_MIN_BYTES
+        saved = None if streaming else saved_output_dir(fpath, sheet, s_dir)
+        if saved:
+            choice = (
+                input(
+                    f"    {saved.parent.name} - {saved.name} is already saved. "
+                    "Update only changed students? [Y/n]: "
+                )
+                .strip()
+                .lower()
+            )
+            if choice != "n":
+                out, changes = upsert_results_to_csv(fpath, sheet, s_dir)
+                print(f"    {len(changes)} change(s) recorded. Saved to: {out}")
+                return
+        out = save_results_to_csv(
+            fpath, sheet_name=sheet, base_dir=s_dir, streaming=streaming
+        )
         print(f"    Saved to: {out}")
     except Exception as e:
         print(f"    Error: {e}")
 
 
 def delete_data_flow(base_dir="user-data"):
-    classes = sorted(
-        [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
-    )
+    classes = list_classes(base_dir)
     if not classes:
         print("    No classes found.")
         return
@@ -78,7 +119,7 @@ def delete_data_flow(base_dir="user-data"):
         )
         if confirm == "y":
             try:
-                shutil.rmtree(os.path.join(base_dir, selected_class))
+                delete_data(base_dir, selected_class)
                 print(f"    Successfully deleted class '{selected_class}'.")
             except Exception as e:
                 print(f"    Error deleting class '{selected_class}': {e}")
@@ -86,14 +127,7 @@ def delete_data_flow(base_dir="user-data"):
             print("    Deletion cancelled.")
         return
 
-    class_path = os.path.join(base_dir, selected_class)
-    exams = sorted(
-        [
-            d
-            for d in os.listdir(class_path)
-            if os.path.isdir(os.path.join(class_path, d))
-        ]
-    )
+    exams = list_exams(base_dir, selected_class)
     if not exams:
         print(f"    No exams found for class '{selected_class}'.")
         return
@@ -125,7 +159,7 @@ def delete_data_flow(base_dir="user-data"):
         )
         if confirm == "y":
             try:
-                shutil.rmtree(os.path.join(class_path, selected_exam))
+                delete_data(base_dir, selected_class, selected_exam)
                 print(
                     f"    Successfully deleted exam '{selected_exam}' for class '{selected_class}'."
                 )
@@ -167,16 +201,152 @@ def download_samples():
         print(f"Error downloading samples: {e}")
 
 
+def _pop_workers(args):
+    # Takes "--workers N" out of args; None when it isn't given, and a
+    # ValueError unless N is a positive whole number.
+    if "--workers" not in args:
+        return None, args
+    i = args.index("--workers")
+    try:
+        workers = int(args[i + 1])
+    except (IndexError, ValueError):
+        workers = 0
+    if workers < 1:
+        raise ValueError("--workers needs a positive whole number")
+    return workers, args[:i] + args[i + 2 :]
+
+
+def batch_ingest(args):
+    upsert = "--upsert" in args
+    args = [a for a in args if a != "--upsert"]
+    try:
+        workers, args = _pop_workers(args)
+    except ValueError:
+        args = []
+    if not args:
+        print(
+            "Usage: result-analysis ingest <file-or-folder>... [--workers N] [--upsert]"
+        )
+        return
+    if not os.path.exists("user-data"):
+        os.makedirs("user-data")
+    reports = ingest_workbooks(
+        args, base_dir="user-data", workers=workers, upsert=upsert
+    )
+    if not reports:
+        print("    No .xlsx files found.")
+        return
+    report_df = pd.DataFrame(reports)
+    report_df["Seconds"] = report_df["Seconds"].map("{:.2f}".format)
+    display_df(report_df, "Batch Ingest")
+    failed = sum(r["Status"] == "failed" for r in reports)
+    print(f"    {len(reports) - failed} sheet(s) saved, {failed} failed.")
+
+
+def batch_group(args):
+    thresholds = None
+    try:
+        workers, args = _pop_workers(args)
+        if args:
+            thresholds = [int(t) for t in args[0].split(",")]
+    except ValueError:
+        print("Usage: result-analysis group [90,80,33] [--workers N]")
+        return
+    combined, reports = group_all("user-data", thresholds, workers)
+    if not reports:
+        print("    No saved classes/exams found.")
+        return
+    report_df = pd.DataFrame(reports)
+    report_df["Seconds"] = report_df["Seconds"].map("{:.2f}".format)
+    display_df(report_df, "Batch Grouping")
+    display_df(combined, "School-wide Grouped Summary (counts)")
+    display_df(
+        school_band_counts("user-data", thresholds), "All Classes by Exam (counts)"
+    )
+    failed = sum(r["Status"] == "failed" for r in reports)
+    print(
+        f"    {len(reports) - failed} class/exam(s) grouped, {failed} failed; "
+        f"combined counts saved as {SCHOOL_GROUPED} in user-data"
+    )
+
+
 def main():
     # Check for CLI commands
     if len(sys.argv) > 1:
         if sys.argv[1] == "download" and len(sys.argv) > 2 and sys.argv[2] == "samples":
             download_samples()
             return
+        elif sys.argv[1] == "ingest":
+            batch_ingest(sys.argv[2:])
+            return
+        elif sys.argv[1] == "group":
+            batch_group(sys.argv[2:])
+            return
+        elif sys.argv[1] == "ranks":
+            if len(sys.argv) < 3:
+                print("Usage: result-analysis ranks <exam>")
+                return
+            ranks = exam_ranks("user-data", sys.argv[2])
+            if ranks.empty:
+                print(f"    No saved classes found for exam {sys.argv[2]}.")
+            else:
+                display_df(ranks, f"{sys.argv[2]} Ranks (all classes)")
+            return
+        elif sys.argv[1] == "export" and len(sys.argv) > 2 and sys.argv[2] == "csv":
+            dest = sys.argv[3] if len(sys.argv) > 3 else "csv-export"
+            exported = export_csv("user-data", dest)
+            print(f"    Exported {len(exported)} table(s) as CSV to {dest}")
+            return
+        elif sys.argv[1] == "export" and sys.argv[2:3] == ["matrix"]:
+            try:
+                dest = export_matrix(
+                    "user-data", sys.argv[3] if len(sys.argv) > 3 else None
+                )
+            except ValueError as e:
+                print(f"    {e}")
+                return
+            print(f"    {open_matrix(path=dest)} written to {dest}")
+            return
+        elif sys.argv[1] == "catalog" and sys.argv[2:3] == ["rebuild"]:
+            catalog = rebuild_catalog("user-data")
+            exams = sum(len(e) for e in catalog.values())
+            print(f"    Catalog rebuilt: {len(catalog)} class(es), {exams} exam(s)")
+            return
+        elif sys.argv[1] == "archive":
+            try:
+                days = int(sys.argv[2]) if len(sys.argv) > 2 else ARCHIVE_AFTER_DAYS
+            except ValueError:
+                days = -1
+            if days < 0:
+                print("Usage: result-analysis archive [days]")
+                return
+            archived = archive_exams("user-data", older_than_days=days)
+            print(f"    Archived {len(archived)} class/exam(s) older than {days} days")
+            return
+        elif sys.argv[1] == "import-db":
+            imported = import_folder_tree("user-data")
+            print(
+                f"    Imported {len(imported)} class/exam folder(s) into the database"
+            )
+            return
         elif sys.argv[1] in ("--help", "-h"):
             print("Usage:")
             print("  result-analysis                  # Run interactive mode")
             print("  result-analysis download samples # Download sample Excel files")
+            print("  result-analysis ingest <paths>   # Ingest workbooks in parallel")
+            print("  result-analysis group [bands]    # Group every class/exam at once")
+            print(
+                "  result-analysis ranks <exam>     # Rank an exam across all classes"
+            )
+            print("  result-analysis export csv [dir] # Export stored tables as CSV")
+            print(
+                "  result-analysis export matrix    # Memory-mapped marks of all classes"
+            )
+            print("  result-analysis import-db        # Load saved folders into SQLite")
+            print("  result-analysis catalog rebuild  # Re-index saved classes/exams")
+            print(
+                "  result-analysis archive [days]   # Compress exams older than N days"
+            )
             return
 
     banners.show_title()
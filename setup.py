@@ -17,6 +17,9 @@ setup(
         "thefuzz>=0.18.0",
         "python-Levenshtein>=0.12.2",
     ],
+    extras_require={
+        "columnar": ["pyarrow>=7.0.0"],
+    },
     entry_points={
         "console_scripts": [
             "result-analysis=main:main",
@@ -33,5 +36,5 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.8",
 )
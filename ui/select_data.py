@@ -4,6 +4,8 @@ import os
 import sys
 from thefuzz import process
 
+from data.catalog import list_classes, list_exams
+
 # --- Curses compatibility check ---
 CURSES_ENABLED = False
 try:
@@ -216,9 +218,7 @@ def fuzzy_search_file_select(stdscr):
 
 
 def select_class_exam(base_dir="user-data"):
-    classes = sorted(
-        [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
-    )
+    classes = list_classes(base_dir)
     if not classes:
         return None, None
 
@@ -233,13 +233,7 @@ def select_class_exam(base_dir="user-data"):
 
     if not s_class:
         return None, None
-    exams = sorted(
-        [
-            d
-            for d in os.listdir(os.path.join(base_dir, s_class))
-            if os.path.isdir(os.path.join(base_dir, s_class, d))
-        ]
-    )
+    exams = list_exams(base_dir, s_class)
     if not exams:
         return None, None
 
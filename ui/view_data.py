@@ -1,4 +1,3 @@
-import pandas as pd
 import os
 import curses
 from .select_data import (
@@ -7,10 +6,11 @@ from .select_data import (
     select_from_list_no_curses,
     CURSES_ENABLED,
 )
-from group.ByPercent import group_by_percent
-from data.exporter import export_df_to_excel
+from group.ByPercent import grouped_table
 from data.printer import display_df
-from pathlib import Path
+from data.catalog import catalog_entry
+from data.ranks import load_ranks
+from data.storage import has_table, read_table
 
 
 def view_data_flow():
@@ -18,7 +18,14 @@ def view_data_flow():
     if not (s_class and s_exam):
         return
     base_path = os.path.join("user-data", s_class, s_exam)
-    opts = ["Percentage", "Grouped", "Full Result", "All"]
+    entry = catalog_entry("user-data", s_class, s_exam)
+    if entry:
+        print(
+            f"    {s_class} - {s_exam}: {entry['rows']} students, "
+            f"{len(entry['subjects'])} subjects, saved {entry['updated']}"
+            + (" (archived)" if entry.get("archived") else "")
+        )
+    opts = ["Percentage", "Grouped", "Ranks", "Full Result", "All"]
 
     if CURSES_ENABLED:
         dtype = curses.wrapper(
@@ -31,51 +38,24 @@ def view_data_flow():
 
     if not dtype:
         return
-    files = {
-        "Percentage": ["percentage.csv"],
-        "Grouped": ["grouped.csv"],
-        "Full Result": ["result.csv"],
-        "All": ["percentage.csv", "result.csv", "grouped.csv"],
+    tables = {
+        "Percentage": ["percentage"],
+        "Grouped": ["grouped"],
+        "Ranks": ["ranks"],
+        "Full Result": ["result"],
+        "All": ["percentage", "result", "grouped"],
     }
-    for f in files.get(dtype, []):
-        fpath = os.path.join(base_path, f)
-        if os.path.isfile(fpath):
-            display_df(pd.read_csv(fpath), f.replace(".csv", " Data").title())
-        else:
-            if f == "grouped.csv":
-                print(f"    {f} not available.")
-                choice = (
-                    input("    Would you like to generate grouped data now? [y/N]: ")
-                    .strip()
-                    .lower()
+    for name in tables.get(dtype, []):
+        if name == "grouped" and has_table(base_path, "percentage"):
+            if not has_table(base_path, name):
+                print(
+                    "    Grouped data not saved yet, grouping with the default bands "
+                    "(use Option 2 for custom bands)."
                 )
-                if choice == "y":
-                    path = os.path.join(base_path, "percentage.csv")
-                    if not os.path.isfile(path):
-                        print(
-                            f"    Error: 'percentage.csv' not found, cannot generate grouped data."
-                        )
-                        continue
-
-                    _, summary_df = group_by_percent(path)
-
-                    # Ask to save
-                    save_choice = (
-                        input(
-                            "    Do you want to save this grouped data to Excel/CSV? [y/N]: "
-                        )
-                        .strip()
-                        .lower()
-                    )
-                    if save_choice == "y":
-                        (Path(path).parent / "grouped.csv").write_text(
-                            summary_df.to_csv(index=False)
-                        )
-                        export_df_to_excel(summary_df, fname="grouped.xlsx")
-                        print("    Saved grouped.csv and grouped.xlsx")
-                else:
-                    print(
-                        "    You can generate it later using Option 2 (Group Data by Percentage)."
-                    )
-            else:
-                print(f"    {f} not available.")
+            display_df(grouped_table(base_path), "Grouped Data")
+        elif name == "ranks" and has_table(base_path, "percentage"):
+            display_df(load_ranks("user-data", s_class, s_exam), "Ranks Data")
+        elif has_table(base_path, name):
+            display_df(read_table(base_path, name), f"{name} Data".title())
+        else:
+            print(f"    {name} data not available.")